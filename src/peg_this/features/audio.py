@@ -5,15 +5,38 @@ import ffmpeg
 import questionary
 from rich.console import Console
 
-from peg_this.utils.ffmpeg_utils import run_command, has_audio_stream
+from peg_this.utils.ffmpeg_utils import run_command, MediaInfo
+from peg_this.utils.ui_utils import press_any_key_to_continue
 
 console = Console()
 
+# Encoder used for each output format when the audio has to be re-encoded
+AUDIO_ENCODERS = {'mp3': 'libmp3lame', 'flac': 'flac', 'wav': 'pcm_s16le'}
 
-def extract_audio(file_path):
+# PCM codecs the WAV muxer can store as-is (not big-endian or disc formats like pcm_bluray)
+WAV_PCM_CODECS = frozenset(('pcm_u8', 'pcm_s16le', 'pcm_s24le', 'pcm_s32le', 'pcm_f32le', 'pcm_f64le'))
+
+
+def _audio_output_args(info, audio_format):
+    """
+    Output options for extracting the first audio track. The track is copied
+    without re-encoding when it is already in the requested format.
+    """
+    codec_name = info.audio_streams[0].get('codec_name', '')
+    if audio_format == 'wav':
+        can_copy = codec_name in WAV_PCM_CODECS
+    else:
+        can_copy = codec_name == audio_format
+
+    # Both paths map the first audio track, the one whose codec was checked
+    return {'map': '0:a:0', 'vn': None, 'acodec': 'copy' if can_copy else AUDIO_ENCODERS[audio_format], 'y': None}
+
+
+def extract_audio(file_path, info=None):
     """Extract the audio track from a video file."""
     try:
-        if not has_audio_stream(file_path):
+        info = info or MediaInfo(file_path)
+        if not info.has_audio():
             console.print("[bold red]Error: No audio stream found in the file.[/bold red]")
             return
 
@@ -21,7 +44,7 @@ def extract_audio(file_path):
         if not audio_format: return
 
         output_file = f"{Path(file_path).stem}_audio.{audio_format}"
-        stream = ffmpeg.input(file_path).output(output_file, vn=None, acodec='libmp3lame' if audio_format == 'mp3' else audio_format, y=None)
+        stream = ffmpeg.input(file_path).output(output_file, **_audio_output_args(info, audio_format))
         
         run_command(stream, f"Extracting audio to {audio_format.upper()}...", show_progress=True)
         console.print(f"[bold green]Successfully extracted audio to {output_file}[/bold green]")
@@ -29,5 +52,5 @@ def extract_audio(file_path):
         console.print("\n[bold yellow]Operation cancelled by user.[/bold yellow]")
         return
     finally:
-        questionary.press_any_key_to_continue().ask()
+        press_any_key_to_continue()
 
@@ -1,17 +1,30 @@
 
 import os
+import json
 import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from pathlib import Path
+from typing import Any, Callable, Dict
 
 import ffmpeg
 import questionary
 from rich.console import Console
+from rich.progress import Progress, SpinnerColumn, BarColumn, TextColumn, MofNCompleteColumn
 
-from peg_this.utils.ffmpeg_utils import run_command, has_audio_stream
-from peg_this.utils.ui_utils import get_media_files
+from peg_this.features.interactive_convert import InteractiveConverter, TrackAction
+from peg_this.utils.ffmpeg_utils import ENCODER_CODEC_NAMES, MediaInfo, option_args, run_argv, run_command, has_audio_stream, parse_media_tracks_many
+from peg_this.utils.log_utils import setup_logging
+from peg_this.utils.ui_utils import MEDIA_EXTENSIONS, get_media_files, press_any_key_to_continue
 
 console = Console()
 
+# Appended to the file name of converted files, e.g. "movie_modified.mkv"
+OUTPUT_SUFFIX = "_modified"
+
+# Encoder threads for this batch worker process, set by _init_worker to its share of the cores
+_worker_threads = 0
+
 
 def batch_convert():
     """Convert all media files in the directory to a specific format."""
@@ -129,4 +142,266 @@ def batch_convert():
         console.print("\n[bold yellow]Operation cancelled by user.[/bold yellow]")
         return
     finally:
-        questionary.press_any_key_to_continue().ask()
+        press_any_key_to_continue()
+
+
+def load_track_actions(actions_json):
+    """
+    Parse a track actions preset into a {track_type: action_info} mapping.
+
+    The preset is a JSON object keyed by track type, e.g.
+    {"video": {"action": "convert", "codec": "libx264"}, "subtitle": "remove"}.
+    Track types that are not listed keep their tracks as-is.
+    """
+    preset = json.loads(actions_json) if actions_json else {}
+    if not isinstance(preset, dict):
+        raise ValueError("Track actions preset must be a JSON object keyed by track type.")
+
+    track_actions = {}
+    for track_type, action_info in preset.items():
+        if isinstance(action_info, str):
+            action_info = {'action': action_info}
+        elif not isinstance(action_info, dict):
+            raise ValueError(f"Action for {track_type} tracks must be a string or an object.")
+        action = action_info.get('action', TrackAction.KEEP)
+        if action not in (TrackAction.REMOVE, TrackAction.KEEP, TrackAction.CONVERT):
+            raise ValueError(f"Unknown action '{action}' for {track_type} tracks.")
+        if action == TrackAction.CONVERT:
+            if not action_info.get('codec'):
+                raise ValueError(f"Missing codec for converted {track_type} tracks.")
+            track_actions[track_type] = {'action': action, 'codec': action_info['codec']}
+        else:
+            track_actions[track_type] = {'action': action}
+    return track_actions
+
+
+def collect_media_files(directory):
+    """
+    Recursively collect media files under a directory, leaving out the "<name>_modified"
+    outputs of earlier batch runs so they are not converted again.
+    """
+    return sorted(
+        path for path in Path(directory).rglob("*")
+        if path.is_file() and path.suffix.lower() in MEDIA_EXTENSIONS and not path.stem.endswith(OUTPUT_SUFFIX)
+    )
+
+
+def needs_processing(tracks, track_actions):
+    """Check whether a preset changes a file, i.e. removes a track or converts one to a different codec."""
+    for track in tracks:
+        action_info = track_actions.get(track['type'], {'action': TrackAction.KEEP})
+        if action_info['action'] == TrackAction.REMOVE:
+            return True
+        if action_info['action'] == TrackAction.CONVERT:
+            codec = InteractiveConverter._clean_codec_choice(action_info['codec']).lower()
+            if ENCODER_CODEC_NAMES.get(codec, codec) != track['codec']:
+                return True
+    return False
+
+
+def _h264_aac_mp4(info: MediaInfo) -> Dict[str, Any]:
+    """H.264 video and AAC audio (ffmpeg's default stream selection), without subtitles."""
+    output_args = {
+        'c:v': 'libx264',
+        'crf': 23,
+        'preset': 'medium',
+        'pix_fmt': 'yuv420p',
+        'sn': None,
+        'movflags': '+faststart',
+        'y': None
+    }
+    if info.audio_streams:
+        output_args['c:a'] = 'aac'
+        output_args['b:a'] = '192k'
+    else:
+        output_args['an'] = None
+    return output_args
+
+
+def _remux_mkv(info: MediaInfo) -> Dict[str, Any]:
+    """
+    Every stream copied as-is into a Matroska container, except data streams (e.g. the
+    tmcd timecode tracks of camera MOV files), which Matroska can't hold. MP4 text
+    subtitles are converted to SubRip for the same reason.
+    """
+    output_args = {'map': ['0', '-0:d?'], 'c': 'copy', 'y': None}
+    subtitle_streams = [s for s in info.streams if s.get('codec_type') == 'subtitle']
+    for index, stream in enumerate(subtitle_streams):
+        if stream.get('codec_name') == 'mov_text':
+            output_args[f'c:s:{index}'] = 'srt'
+    return output_args
+
+
+# Fixed output profiles that skip the per-track menus. Names end with the output container.
+PRESETS: Dict[str, Callable[[MediaInfo], Dict[str, Any]]] = {
+    'h264_aac_mp4': _h264_aac_mp4,
+    'remux_mkv': _remux_mkv,
+}
+
+
+def _quiet_tracks(info):
+    """Tracks of a file, logging probe errors instead of printing them (for batch worker processes)."""
+    try:
+        info.streams
+    except ffmpeg.Error as e:
+        logging.error(f"Could not read tracks of {info.file_path}: {e}")
+        return []
+    return info.tracks
+
+
+def process_preset(file_path, preset, show_progress=False, quiet=False):
+    """
+    Convert a single file with one of the fixed PRESETS.
+    With quiet, nothing is printed; failures are only logged (see run_argv).
+    """
+    source = Path(file_path)
+    info = MediaInfo(file_path)
+    if not (_quiet_tracks(info) if quiet else info.tracks):
+        return False
+
+    output_path = source.with_name(f"{source.stem}{OUTPUT_SUFFIX}.{preset.rsplit('_', 1)[-1]}")
+    output_args = PRESETS[preset](info)
+    if _worker_threads and 'c:v' in output_args:
+        output_args['threads'] = _worker_threads
+    argv = ['ffmpeg', '-hide_banner', '-i', file_path] + option_args(output_args) + [str(output_path)]
+    return run_argv(argv, f"Converting {source.name}...", show_progress=show_progress, quiet=quiet) is not None
+
+
+def process_one(file_path, actions_json):
+    """
+    Convert a single file without prompting, applying a track actions preset to every track.
+    Runs in a batch worker process, so nothing is printed; failures are only logged.
+    """
+    track_actions = load_track_actions(actions_json)
+    source = Path(file_path)
+
+    converter = InteractiveConverter(file_path)
+    converter.threads = _worker_threads
+    converter.tracks = _quiet_tracks(converter.info)
+    if not converter.tracks:
+        return False
+
+    for track_id, track in enumerate(converter.tracks):
+        converter.track_actions[track_id] = dict(track_actions.get(track['type'], {'action': TrackAction.KEEP}))
+    converter.output_path = source.with_name(f"{source.stem}{OUTPUT_SUFFIX}{source.suffix}")
+
+    argv = converter.build_argv()
+    if argv is None:
+        return False
+    return run_argv(argv, f"Converting {source.name}...", quiet=True) is not None
+
+
+def _init_worker(log_file, jobs, next_slot=None):
+    """
+    Batch worker initializer. Workers started with spawn or forkserver don't inherit the
+    parent's logging, so they append to its log file. Each worker's encoders get an equal
+    share of the cores, so jobs don't start jobs * cores threads; with next_slot, cores are pinned too.
+    """
+    global _worker_threads
+    if log_file:
+        setup_logging(log_file, mode='a')
+    _worker_threads = max(1, (os.cpu_count() or 1) // jobs)
+    if next_slot is not None:
+        _pin_worker(next_slot, jobs)
+
+
+def _pin_worker(next_slot, jobs):
+    """
+    Batch worker initializer: pin this worker to its own share of the CPUs and lower its
+    priority. The ffmpeg processes it starts inherit both, so parallel encoders don't
+    compete for the same cores and caches.
+    """
+    global _worker_threads
+    with next_slot.get_lock():
+        slot = next_slot.value
+        next_slot.value += 1
+
+    cpus = sorted(os.sched_getaffinity(0))
+    per_worker = max(1, len(cpus) // jobs)
+    start = (slot * per_worker) % len(cpus)
+    pinned = cpus[start:start + per_worker]
+    try:
+        os.sched_setaffinity(0, pinned)
+        os.nice(5)
+    except OSError as e:
+        logging.warning(f"Could not pin batch worker {slot} to CPUs {pinned}: {e}")
+        return
+    _worker_threads = len(pinned)
+
+
+def batch_convert_parallel(directory, actions_json=None, jobs=None, preset=None, pin_cores=False):
+    """
+    Convert every media file under a directory, running one ffmpeg job per CPU core.
+    Files are converted with a fixed preset when one is given, otherwise with the track actions.
+    With pin_cores, each job is pinned to its own set of cores (Linux only).
+    """
+    media_files = collect_media_files(directory)
+    if not media_files:
+        console.print(f"[bold yellow]No media files found in '{directory}'.[/bold yellow]")
+        return
+
+    jobs = jobs or os.cpu_count() or 1
+    track_actions = load_track_actions(actions_json)
+
+    success_count = 0
+    skip_count = 0
+    fail_count = 0
+
+    # Probe everything up front to skip files the preset wouldn't change
+    console.print(f"[bold cyan]Analyzing {len(media_files)} media file(s)...[/bold cyan]")
+    pending_files = []
+    for path, info in parse_media_tracks_many(media_files, jobs):
+        if not info.tracks:
+            console.print(f"  -> [bold red]Failed to read tracks of {path}.[/bold red]")
+            fail_count += 1
+        elif not preset and not needs_processing(info.tracks, track_actions):
+            console.print(f"[bold yellow]Skipping {path}: Already matches the track actions.[/bold yellow]")
+            skip_count += 1
+        else:
+            pending_files.append(path)
+    pending_files.sort()
+
+    console.print(f"[bold cyan]Converting {len(pending_files)} file(s) using {jobs} parallel job(s)...[/bold cyan]")
+
+    log_files = [h.baseFilename for h in logging.getLogger().handlers if isinstance(h, logging.FileHandler)]
+    initargs = (log_files[0] if log_files else None, jobs)
+    if pin_cores:
+        if hasattr(os, 'sched_setaffinity'):
+            initargs += (multiprocessing.Value('i', 0),)
+        else:
+            console.print("[bold yellow]Warning: --pin-cores is not supported on this platform, ignoring it.[/bold yellow]")
+
+    with ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker, initargs=initargs) as executor, Progress(
+        SpinnerColumn(),
+        TextColumn("[progress.description]{task.description}"),
+        BarColumn(),
+        MofNCompleteColumn(),
+        console=console,
+    ) as progress:
+        task = progress.add_task("Batch converting...", total=len(pending_files))
+        if preset:
+            futures = {executor.submit(process_preset, str(path), preset, quiet=True): path for path in pending_files}
+        else:
+            futures = {executor.submit(process_one, str(path), actions_json): path for path in pending_files}
+        try:
+            for future in as_completed(futures):
+                path = futures[future]
+                try:
+                    succeeded = future.result()
+                except Exception as e:
+                    logging.error(f"Batch convert error for file {path}: {e}")
+                    succeeded = False
+
+                if succeeded:
+                    success_count += 1
+                else:
+                    console.print(f"  -> [bold red]Failed to convert {path}. See the log for details.[/bold red]")
+                    fail_count += 1
+                progress.advance(task)
+        except KeyboardInterrupt:
+            for future in futures:
+                future.cancel()
+            console.print("\n[bold yellow]Batch conversion cancelled by user.[/bold yellow]")
+
+    console.rule("[bold green]Batch Conversion Complete[/bold green]")
+    console.print(f"Successful: {success_count} | Skipped: {skip_count} | Failed: {fail_count}")
@@ -3,26 +3,28 @@ import os
 import logging
 
 import ffmpeg
-import questionary
 from rich.console import Console
 from rich.table import Table
 
+from peg_this.utils.ffmpeg_utils import MediaInfo
+from peg_this.utils.ui_utils import press_any_key_to_continue
+
 console = Console()
 
 
-def inspect_file(file_path):
+def inspect_file(file_path, info=None):
     """Show detailed information about the selected media file using ffprobe."""
     try:
         console.print(f"Inspecting {os.path.basename(file_path)}...")
         try:
-            info = ffmpeg.probe(file_path)
+            probe = (info or MediaInfo(file_path)).probe
         except ffmpeg.Error as e:
             console.print("[bold red]An error occurred while inspecting the file:[/bold red]")
             console.print(e.stderr.decode('utf-8'))
             logging.error(f"ffprobe error:{e.stderr.decode('utf-8')}")
             return
 
-        format_info = info.get('format', {})
+        format_info = probe.get('format', {})
         table = Table(title=f"File Information: {os.path.basename(file_path)}", show_header=True, header_style="bold magenta")
         table.add_column("Property", style="dim")
         table.add_column("Value")
@@ -38,7 +40,7 @@ def inspect_file(file_path):
         console.print(table)
 
         for stream_type in ['video', 'audio']:
-            streams = [s for s in info.get('streams', []) if s.get('codec_type') == stream_type]
+            streams = [s for s in probe.get('streams', []) if s.get('codec_type') == stream_type]
             if streams:
                 stream_table = Table(title=f"{stream_type.capitalize()} Streams", show_header=True, header_style=f"bold {'cyan' if stream_type == 'video' else 'green'}")
                 stream_table.add_column("Stream")
@@ -60,4 +62,4 @@ def inspect_file(file_path):
         console.print("\n[bold yellow]Operation cancelled by user.[/bold yellow]")
         return
     finally:
-        questionary.press_any_key_to_continue().ask()
+        press_any_key_to_continue()
@@ -1,24 +1,55 @@
 import os
 import sys
+import functools
 from pathlib import Path
-from typing import List, Dict, Any, Optional
+from types import MappingProxyType
+from typing import List, Dict, Any, Optional, Tuple
 
 import ffmpeg
 import questionary
-from rich.console import Console
+from rich.console import Console, Group
+from rich.live import Live
 from rich.table import Table
 from rich.panel import Panel
 from rich import box
 
 from peg_this.utils.ffmpeg_utils import (
-    parse_media_tracks, 
+    MediaInfo,
+    VAAPI_DEVICE,
     get_codec_options, 
     get_default_codec,
-    run_command
+    option_args,
+    run_argv
 )
+from peg_this.utils.ui_utils import press_any_key_to_continue
 
 console = Console()
 
+# Arrow key escape sequences read in the track selection menu
+KEY_UP = b'\x1b[A'
+KEY_DOWN = b'\x1b[B'
+KEY_LEFT = b'\x1b[D'
+
+# Lines of the track selection menu that are not track rows (header, controls, table header)
+TRACK_MENU_CHROME_LINES = 16
+
+# Output order of track types in generated commands
+TRACK_TYPE_ORDER = {'video': 0, 'audio': 1, 'subtitle': 2}
+
+# Legacy codec choices that only had the parenthesized label, e.g. "(SubRip)"
+_LEGACY_PAREN_MAP = {"subrip": "srt", "ass": "ass", "mp4": "mov_text"}
+
+
+@functools.lru_cache(maxsize=256)
+def _clean_codec_choice(selected_option: str) -> str:
+    cleaned = selected_option.strip()
+    if cleaned.startswith("(") and cleaned.endswith(")"):
+        inner = cleaned[1:-1].strip().lower()
+        return _LEGACY_PAREN_MAP.get(inner, inner)
+
+    return cleaned.split(" ", 1)[0].strip()
+
+
 class TrackAction:
     """Track action constants."""
     REMOVE = "remove"
@@ -27,12 +58,21 @@ class TrackAction:
 
 class InteractiveConverter:
     """Interactive track-based converter with multi-level menus."""
+
+    _TYPE_ICON = MappingProxyType({
+        'video': '🎬',
+        'audio': '🎵',
+        'subtitle': '📝'
+    })
     
-    def __init__(self, file_path: str):
+    def __init__(self, file_path: str, info: Optional[MediaInfo] = None):
         self.file_path = file_path
+        self.info = info or MediaInfo(file_path)
         self.tracks = []
         self.track_actions = {}  # {track_id: {'action': action, 'codec': codec}}
+        self._track_cells: List[Tuple[str, str, str, str]] = []  # Static menu cells per track, see _cache_track_cells
         self.output_path: Optional[Path] = None
+        self.threads = 0  # Encoder thread limit for converted video, 0 keeps the encoder's default (every core)
 
     @staticmethod
     def _clean_codec_choice(selected_option: str) -> str:
@@ -46,24 +86,12 @@ class InteractiveConverter:
         """
         if not selected_option:
             return selected_option
-
-        cleaned = selected_option.strip()
-        if cleaned.startswith("(") and cleaned.endswith(")"):
-            inner = cleaned[1:-1].strip().lower()
-            if "subrip" in inner:
-                return "srt"
-            if inner == "ass":
-                return "ass"
-            if "mp4" in inner:
-                return "mov_text"
-            return inner
-
-        return cleaned.split(" ", 1)[0].strip()
+        return _clean_codec_choice(selected_option)
 
     def extract_tracks(self):
         """Extract all tracks from the media file."""
         console.print("[bold cyan]Analyzing media file...[/bold cyan]")
-        self.tracks = parse_media_tracks(self.file_path)
+        self.tracks = self.info.tracks
         
         if not self.tracks:
             console.print("[bold red]No tracks found in the media file.[/bold red]")
@@ -79,21 +107,19 @@ class InteractiveConverter:
         
     def get_track_display_text(self, track: Dict[str, Any], index: int) -> str:
         """Get formatted display text for a track."""
-        track_type_icon = {
-            'video': '🎬',
-            'audio': '🎵',
-            'subtitle': '📝'
-        }.get(track['type'], '❓')
-        
-        basic_info = f"[{index}] {track_type_icon} {track['type'].upper()} - {track['codec']}"
-            
+        basic_info = f"[{index}] {self._TYPE_ICON.get(track['type'], '❓')} {track['type'].upper()} - {track['codec']}"
+        return f"{basic_info} | {self._track_details(track)}"
+
+    @staticmethod
+    def _track_details(track: Dict[str, Any]) -> str:
+        """Get the type-specific details of a track (resolution, channels, language...)."""
         if track['type'] == 'video':
             resolution = f"{track.get('width', 0)}x{track.get('height', 0)}"
             fps = f"{track.get('fps', 0):.2f}" if track.get('fps') else "unknown"
             duration = track.get('duration', 0)
             if duration:
                 duration = f"{float(duration):.1f}s"
-            return f"{basic_info} | {resolution} | {fps}fps | {duration}"
+            return f"{resolution} | {fps}fps | {duration}"
             
         elif track['type'] == 'audio':
             channels = track.get('channels', 0)
@@ -105,127 +131,161 @@ class InteractiveConverter:
             language = track.get('language', 'und')
             if language == 'und':
                 language = 'unknown'
-            return f"{basic_info} | {channels}ch | {sample_rate}Hz | {bit_rate} | {duration} | {language}"
+            return f"{channels}ch | {sample_rate}Hz | {bit_rate} | {duration} | {language}"
             
         else:  # subtitle
             language = track.get('language', 'und')
             if language == 'und':
                 language = 'unknown'
             title = track.get('title', '')
-            return f"{basic_info} | {language} | {title}"
-            
+            return f"{language} | {title}"
+
+    def _action_label(self, index: int) -> str:
+        """Get the action indicator for a track, e.g. "KEEP" or "CONVERT: libx264"."""
+        if index not in self.track_actions:
+            return "Not set"
+        action = self.track_actions[index]['action']
+        if action == TrackAction.REMOVE:
+            return "REMOVE"
+        if action == TrackAction.KEEP:
+            return "KEEP"
+        if action == TrackAction.CONVERT:
+            codec = self.track_actions[index].get('codec', 'unknown')
+            return f"CONVERT: {codec}"
+        return ""
+
+    def _action_suffix(self, index: int) -> str:
+        """Get the action indicator shown after a track's display text."""
+        label = self._action_label(index)
+        return f" [{label}]" if label else ""
+
     def show_track_selection_menu(self):
         """Show the main track selection menu with arrow navigation and keyboard shortcuts."""
+        # Import here to avoid conflicts with questionary in some environments
+        import termios, tty
+
         # Track the currently selected track index
         current_selection = 0
-        
-        while True:
-            console.clear()
-            self._show_header()
-            
-            # Show instructions for keyboard shortcuts
-            console.print("\n[bold]Keyboard Controls:[/bold]")
-            console.print("  [↑][↓]: Navigate between tracks")
-            console.print("  [R]emove, [K]eep, [C]onvert: Apply to currently selected track")
-            console.print("  [Enter]: Continue with conversion")
-            console.print("  [←]: Go back to main menu")
-            
-            # Show tracks with the currently selected one highlighted
-            console.print("\n[bold]Tracks:[/bold]")
-            
-            for i, track in enumerate(self.tracks):
-                display_text = self.get_track_display_text(track, i)
-                
-                # Add action indicator
-                if i in self.track_actions:
-                    action = self.track_actions[i]['action']
-                    if action == TrackAction.REMOVE:
-                        display_text += " [REMOVE]"
-                    elif action == TrackAction.KEEP:
-                        display_text += " [KEEP]"
-                    elif action == TrackAction.CONVERT:
-                        codec = self.track_actions[i].get('codec', 'unknown')
-                        display_text += f" [CONVERT: {codec}]"
-                else:
-                    display_text += " [Not set]"
-                
-                # Highlight the currently selected track
-                if i == current_selection:
-                    console.print(f"> [bold yellow]{i}[/bold yellow] {display_text}")
-                else:
-                    console.print(f"  [bold]{i}[/bold] {display_text}")
-            
-            try:
-                # Import here to avoid conflicts with questionary in some environments
-                import termios, tty, sys
-                fd = sys.stdin.fileno()
-                
-                # Save current terminal settings
-                old_settings = termios.tcgetattr(fd)
-                
-                try:
-                    # Change terminal to raw mode to read single characters
-                    tty.setraw(fd)
-                    ch = sys.stdin.read(1)
-                    
-                    # Handle ANSI escape sequences for arrow keys
-                    if ord(ch) == 27:  # ESC sequence
-                        ch = sys.stdin.read(1)  # Read [
-                        if ch == '[':
-                            ch = sys.stdin.read(1)  # Read actual key
-                            if ch == 'A':  # Up arrow
-                                current_selection = max(0, current_selection - 1)
-                                continue
-                            elif ch == 'B':  # Down arrow
-                                current_selection = min(len(self.tracks) - 1, current_selection + 1)
-                                continue
-                            elif ch == 'C':  # Right arrow - do nothing
-                                continue  # Just continue the loop without changing anything
-                            elif ch == 'D':  # Left arrow - go back to main menu
-                                # Return a special value to indicate going back to main menu
-                                return "back_to_main"
-
-                    
-                    # Handle regular character inputs
-                    if ch.lower() == 'r':
-                        # Apply Remove action to currently selected track
-                        self.track_actions[current_selection] = {'action': TrackAction.REMOVE}
-                        console.print(f"\n[green]Track {current_selection} marked for removal[/green]")
-                    elif ch.lower() == 'k':
-                        # Apply Keep action to currently selected track
-                        self.track_actions[current_selection] = {'action': TrackAction.KEEP}
-                        console.print(f"\n[green]Track {current_selection} marked to keep[/green]")
-                    elif ch.lower() == 'c':
-                        # Apply Convert action to currently selected track
-                        self._show_codec_selection_menu(current_selection)
-                    elif ord(ch) == 13 or ord(ch) == 10:  # Enter key
-                        # Continue with conversion - break the loop normally
-                        break
-                    else:
-                        # Any other key just refreshes the display
-                        continue
-                        
-                finally:
-                    # Restore original terminal settings
-                    termios.tcsetattr(fd, termios.TCSADRAIN, old_settings)
-                    
-            except (KeyboardInterrupt, EOFError):
-                # Handle Ctrl+C or EOF by propagating the cancellation
-                raise  # Re-raise the exception to be handled by the calling function
-        
-        # If we get here, either Enter was pressed (break) or Ctrl+C (exception)
-        # Return None to indicate normal flow should continue
-        return None
+        fd = sys.stdin.fileno()
+        self._cache_track_cells()
 
-    def _show_header(self):
-        """Show the header panel."""
+        # Save current terminal settings
+        old_settings = termios.tcgetattr(fd)
+        try:
+            # Read single keys for the whole menu. Unlike raw mode, cbreak keeps output
+            # processing (so the menu can be redrawn while reading) and Ctrl+C (KeyboardInterrupt).
+            tty.setcbreak(fd)
+
+            with Live(self._render_track_menu(current_selection), console=console, screen=True, auto_refresh=False) as live:
+                while True:
+                    # A single read returns whole escape sequences (and any keys typed ahead)
+                    for key in self._split_keys(os.read(fd, 8)):
+                        if key == KEY_UP:
+                            current_selection = max(0, current_selection - 1)
+                        elif key == KEY_DOWN:
+                            current_selection = min(len(self.tracks) - 1, current_selection + 1)
+                        elif key == KEY_LEFT:
+                            # Return a special value to indicate going back to main menu
+                            return "back_to_main"
+                        elif key.lower() == b'r':
+                            # Apply Remove action to currently selected track
+                            self.track_actions[current_selection] = {'action': TrackAction.REMOVE}
+                        elif key.lower() == b'k':
+                            # Apply Keep action to currently selected track
+                            self.track_actions[current_selection] = {'action': TrackAction.KEEP}
+                        elif key.lower() == b'c':
+                            # Apply Convert action to currently selected track; questionary needs the normal screen and terminal mode
+                            live.stop()
+                            termios.tcsetattr(fd, termios.TCSADRAIN, old_settings)
+                            try:
+                                self._show_codec_selection_menu(current_selection)
+                            finally:
+                                tty.setcbreak(fd)
+                                live.start()
+                        elif key in (b'\r', b'\n'):  # Enter key
+                            # Continue with conversion
+                            return None
+                        else:
+                            # Right arrow and any other key do nothing
+                            continue
+
+                        live.update(self._render_track_menu(current_selection), refresh=True)
+        finally:
+            # Restore original terminal settings
+            termios.tcsetattr(fd, termios.TCSADRAIN, old_settings)
+
+    @staticmethod
+    def _split_keys(data: bytes) -> List[bytes]:
+        """Split raw terminal input into keys, keeping arrow key escape sequences together."""
+        keys = []
+        i = 0
+        while i < len(data):
+            if data[i:i + 2] == b'\x1b[' and i + 2 < len(data):
+                keys.append(data[i:i + 3])
+                i += 3
+            else:
+                keys.append(data[i:i + 1])
+                i += 1
+        return keys
+
+    def _cache_track_cells(self):
+        """Format the parts of each track's menu row that don't change while the menu is open."""
+        self._track_cells = [
+            (
+                self._TYPE_ICON.get(track['type'], '❓'),
+                track['type'].upper(),
+                track['codec'],
+                self._track_details(track),
+            )
+            for track in self.tracks
+        ]
+
+    def _render_track_menu(self, current_selection: int) -> Group:
+        """Build the track selection menu: header, keyboard controls and the track table."""
+        controls = (
+            "\n[bold]Keyboard Controls:[/bold]\n"
+            "  [↑][↓]: Navigate between tracks\n"
+            "  [R]emove, [K]eep, [C]onvert: Apply to currently selected track\n"
+            "  [Enter]: Continue with conversion\n"
+            "  [←]: Go back to main menu\n"
+        )
+
+        table = Table(box=box.SIMPLE, title="Tracks", title_justify="left", title_style="bold")
+        table.add_column("")
+        table.add_column("#", justify="right", style="bold")
+        table.add_column("")
+        table.add_column("Type")
+        table.add_column("Codec")
+        table.add_column("Details")
+        table.add_column("Action")
+
+        # Only show the tracks around the selection that fit on screen
+        visible_rows = max(console.height - TRACK_MENU_CHROME_LINES, 3)
+        first_row = min(max(0, current_selection - visible_rows // 2), max(0, len(self.tracks) - visible_rows))
+        for i in range(first_row, min(len(self.tracks), first_row + visible_rows)):
+            selected = i == current_selection
+            table.add_row(
+                ">" if selected else "",
+                str(i),
+                *self._track_cells[i],
+                self._action_label(i),
+                style="bold yellow" if selected else None
+            )
+
+        return Group(self._header_panel(), controls, table)
+
+    def _header_panel(self) -> Panel:
+        """Build the header panel."""
         file_name = os.path.basename(self.file_path)
-        panel = Panel(
+        return Panel(
             f"[bold]File:[/bold] {file_name}\n",
             title="🎬 Interactive Modify Tracks",
             border_style="cyan"
         )
-        console.print(panel)
+
+    def _show_header(self):
+        """Show the header panel."""
+        console.print(self._header_panel())
         
     def _get_menu_choices(self):
         """Get the choices for the main menu."""
@@ -233,20 +293,7 @@ class InteractiveConverter:
         
         # Add track selections
         for i, track in enumerate(self.tracks):
-            display_text = self.get_track_display_text(track, i)
-            # Add action indicator
-            if i in self.track_actions:
-                action = self.track_actions[i]['action']
-                if action == TrackAction.REMOVE:
-                    display_text += " [REMOVE]"
-                elif action == TrackAction.KEEP:
-                    display_text += " [KEEP]"
-                elif action == TrackAction.CONVERT:
-                    codec = self.track_actions[i]['codec']
-                    display_text += f" [CONVERT: {codec}]"
-            else:
-                display_text += " [Not set]"
-            
+            display_text = self.get_track_display_text(track, i) + self._action_suffix(i)
             choices.append(display_text)
             
         choices.append(questionary.Separator())
@@ -261,7 +308,7 @@ class InteractiveConverter:
         track_type = track['type']
         
         default_codec = get_default_codec(track_type)
-        codec_choices = get_codec_options(track_type) + [questionary.Separator(), "Go back to tracks"]
+        codec_choices = list(get_codec_options(track_type)) + [questionary.Separator(), "Go back to tracks"]
         
         console.clear()
         self._show_header()
@@ -315,99 +362,161 @@ class InteractiveConverter:
     def generate_ffmpeg_command(self) -> Optional[Any]:
         """Generate the ffmpeg command based on track actions."""
         try:
-            if not self.output_path:
-                console.print("[bold red]Error: Output path not configured[/bold red]")
+            plan = self._plan_output()
+            if not plan:
                 return None
+            input_args, output_tracks, output_args = plan
 
-            input_stream = ffmpeg.input(self.file_path)
-            output_args = {'y': None}
-            
-            # Build streams list and codec parameters for output
-            video_streams = []
-            audio_streams = []
-            subtitle_streams = []
-            
-            # Counters for stream-specific parameters in the final command
-            video_idx_counter = 0
-            audio_idx_counter = 0
-            subtitle_idx_counter = 0
-            
-            # Process each track and build streams list with appropriate codec parameters
-            for track_id, track in enumerate(self.tracks):
-                stream_index = track['index']
-                action_info = self.track_actions.get(track_id, {})
-                action = action_info.get('action', TrackAction.KEEP)
-                
-                if action == TrackAction.REMOVE:
-                    continue  # Skip this stream
-                elif action == TrackAction.KEEP:
-                    # For KEEP action, process with copy codec
-                    if track['type'] == 'video':
-                        stream = self._process_video_stream(input_stream, stream_index, 'copy')
-                        if stream:
-                            video_streams.append(stream)
-                            # Add copy codec parameter for this video stream (by index in output)
-                            output_args[f'c:v:{video_idx_counter}'] = 'copy'
-                        video_idx_counter += 1
-                    elif track['type'] == 'audio':
-                        stream = self._process_audio_stream(input_stream, stream_index, 'copy')
-                        if stream:
-                            audio_streams.append(stream)
-                            # Add copy codec parameter for this audio stream (by index in output)
-                            output_args[f'c:a:{audio_idx_counter}'] = 'copy'
-                        audio_idx_counter += 1
-                    elif track['type'] == 'subtitle':
-                        stream = self._process_subtitle_stream(input_stream, stream_index, 'copy')
-                        if stream:
-                            subtitle_streams.append(stream)
-                            # Add copy codec parameter for this subtitle stream (by index in output)
-                            output_args[f'c:s:{subtitle_idx_counter}'] = 'copy'
-                        subtitle_idx_counter += 1
-                elif action == TrackAction.CONVERT:
-                    # For CONVERT action, set per-stream output codec args
-                    codec = self._clean_codec_choice(action_info.get('codec', ''))
-                    if track['type'] == 'video':
-                        stream = self._process_video_stream(input_stream, stream_index, codec)
-                        if stream:
-                            video_streams.append(stream)
-                            self._set_video_output_args(output_args, video_idx_counter, codec)
-                        video_idx_counter += 1
-                    elif track['type'] == 'audio':
-                        stream = self._process_audio_stream(input_stream, stream_index, codec)
-                        if stream:
-                            audio_streams.append(stream)
-                            self._set_audio_output_args(output_args, audio_idx_counter, codec)
-                        audio_idx_counter += 1
-                    elif track['type'] == 'subtitle':
-                        stream = self._process_subtitle_stream(input_stream, stream_index, codec)
-                        if stream:
-                            subtitle_streams.append(stream)
-                            self._set_subtitle_output_args(output_args, subtitle_idx_counter, codec)
-                        subtitle_idx_counter += 1
-            
-            # Build output stream list - first video, then audio, then subtitles to match index order
-            output_streams = []
-            output_streams.extend(video_streams)
-            output_streams.extend(audio_streams) 
-            output_streams.extend(subtitle_streams)
-            
-            if not output_streams:
+            input_stream = ffmpeg.input(self.file_path, **input_args)
+            output_streams = [
+                self._process_stream(input_stream, stream_index, track_type)
+                for track_type, stream_index, _ in output_tracks
+            ]
+            # An empty track list means every input stream is kept with "-map 0"
+            return ffmpeg.output(*(output_streams or [input_stream]), str(self.output_path), **output_args)
+
+        except Exception as e:
+            console.print(f"[bold red]Error generating ffmpeg command: {e}[/bold red]")
+            return None
+
+    def build_argv(self) -> Optional[List[str]]:
+        """
+        Build the ffmpeg argument list for the track actions directly, without going
+        through ffmpeg-python's stream graph. Produces the same arguments as
+        generate_ffmpeg_command(), prefixed with "ffmpeg -hide_banner".
+        """
+        try:
+            plan = self._plan_output()
+            if not plan:
                 return None
-                
-            return ffmpeg.output(*output_streams, str(self.output_path), **output_args)
-            
+            input_args, output_tracks, output_args = plan
+
+            argv = ['ffmpeg', '-hide_banner']
+            argv += option_args(input_args)
+            argv += ['-i', self.file_path]
+            for _, stream_index, _ in output_tracks:
+                argv += ['-map', f'0:{stream_index}']
+            argv += option_args(output_args)
+            argv.append(str(self.output_path))
+            return argv
+
         except Exception as e:
             console.print(f"[bold red]Error generating ffmpeg command: {e}[/bold red]")
             return None
-            
+
+    def _plan_output(self) -> Optional[Tuple[Dict[str, Any], List[Tuple[str, int, str]], Dict[str, Any]]]:
+        """
+        Work out the input options, the output tracks and the output options for the track actions.
+        Output tracks are (type, stream index, codec) tuples in output order; the list is empty
+        when every input stream is mapped with "-map 0". Returns None when nothing would be output.
+        """
+        if not self.output_path:
+            console.print("[bold red]Error: Output path not configured[/bold red]")
+            return None
+
+        input_args = {}
+        if self._uses_vaapi():
+            # VAAPI encoders need a device and frames uploaded to it (see _set_video_output_args)
+            input_args['vaapi_device'] = VAAPI_DEVICE
+
+        output_args = {'y': None}
+
+        # Remux fast path: when nothing is converted a single "-c copy" covers every stream
+        actions = [self.track_actions.get(track_id, {}).get('action', TrackAction.KEEP) for track_id in range(len(self.tracks))]
+        copy_only = TrackAction.CONVERT not in actions
+
+        # Output tracks and the setter for their per-stream codec parameters, by track type
+        video_streams = []
+        audio_streams = []
+        subtitle_streams = []
+        buckets = {'video': video_streams, 'audio': audio_streams, 'subtitle': subtitle_streams}
+        setters = {
+            'video': functools.partial(self._set_video_output_args, threads=self.threads),
+            'audio': self._set_audio_output_args,
+            'subtitle': self._set_subtitle_output_args,
+        }
+
+        # Counters for stream-specific parameters in the final command
+        counters = {'video': 0, 'audio': 0, 'subtitle': 0}
+
+        # Process each track and build streams list with appropriate codec parameters
+        for track_id, track in enumerate(self.tracks):
+            track_type = track['type']
+            action_info = self.track_actions.get(track_id, {})
+            action = action_info.get('action', TrackAction.KEEP)
+
+            if action == TrackAction.REMOVE or track_type not in buckets:
+                continue  # Skip this stream
+
+            # KEEP copies the stream; a single "-c copy" covers it in the remux fast path
+            codec = 'copy' if action == TrackAction.KEEP else self._clean_codec_choice(action_info.get('codec', ''))
+            buckets[track_type].append((track_type, track['index'], codec))
+            if action == TrackAction.CONVERT or not copy_only:
+                setters[track_type](output_args, counters[track_type], codec)
+            counters[track_type] += 1
+
+        # Build output track list - first video, then audio, then subtitles to match index order
+        output_tracks = video_streams + audio_streams + subtitle_streams
+        if not output_tracks:
+            return None
+
+        if copy_only:
+            output_args['c'] = 'copy'
+            if self._can_map_all_streams(actions):
+                # Keep every input stream (including attachments) as-is with "-map 0"
+                output_tracks = []
+                output_args['map'] = '0'
+
+        return input_args, output_tracks, output_args
+
+    def _can_map_all_streams(self, actions: List[str]) -> bool:
+        """
+        Check whether "-map 0" gives the same output as mapping each track: every track
+        is kept, the file has no other streams (data or attachments, which "-map 0" would
+        also copy), tracks are already ordered video/audio/subtitle, and the container doesn't change.
+        """
+        if any(action != TrackAction.KEEP for action in actions):
+            return False
+        if len(self.info.streams) != len(self.tracks):
+            return False
+        type_order = [TRACK_TYPE_ORDER.get(track['type'], len(TRACK_TYPE_ORDER)) for track in self.tracks]
+        if type_order != sorted(type_order):
+            return False
+        return Path(self.file_path).suffix.lower() == Path(self.output_path).suffix.lower()
+
+    def _uses_vaapi(self) -> bool:
+        """Check whether any track is converted with a VAAPI encoder."""
+        return any(
+            action_info.get('action') == TrackAction.CONVERT
+            and self._clean_codec_choice(action_info.get('codec', '')).lower().endswith('_vaapi')
+            for action_info in self.track_actions.values()
+        )
+
     @staticmethod
-    def _set_video_output_args(output_args: Dict[str, Any], output_index: int, codec: str) -> None:
+    def _set_video_output_args(output_args: Dict[str, Any], output_index: int, codec: str, threads: int = 0) -> None:
         codec_l = (codec or "").lower()
         if codec_l in {"copy", ""}:
             output_args[f"c:v:{output_index}"] = "copy"
             return
 
         output_args[f"c:v:{output_index}"] = codec
+        if codec_l.endswith("_nvenc"):
+            output_args[f"preset:v:{output_index}"] = "p4"
+            output_args[f"rc:v:{output_index}"] = "vbr"
+            output_args[f"cq:v:{output_index}"] = 23
+            output_args[f"b:v:{output_index}"] = 0
+            return
+        if codec_l.endswith("_qsv"):
+            output_args[f"preset:v:{output_index}"] = "medium"
+            output_args[f"global_quality:v:{output_index}"] = 23
+            return
+        if codec_l.endswith("_vaapi"):
+            output_args[f"filter:v:{output_index}"] = "format=nv12,hwupload"
+            return
+        if codec_l.endswith("_videotoolbox"):
+            output_args[f"q:v:{output_index}"] = 50
+            return
+
         if codec_l == "libx264":
             output_args[f"crf:v:{output_index}"] = 23
             output_args[f"preset:v:{output_index}"] = "medium"
@@ -416,6 +525,14 @@ class InteractiveConverter:
             output_args[f"crf:v:{output_index}"] = 28
             output_args[f"preset:v:{output_index}"] = "medium"
 
+        # Encoders already use every core by default; only a thread limit needs options
+        if threads > 0:
+            output_args[f"threads:v:{output_index}"] = threads
+            if codec_l == "libx264":
+                output_args[f"x264-params:v:{output_index}"] = f"threads={threads}"
+            elif codec_l == "libx265":
+                output_args[f"x265-params:v:{output_index}"] = f"pools={threads}"
+
     @staticmethod
     def _set_audio_output_args(output_args: Dict[str, Any], output_index: int, codec: str) -> None:
         codec_l = (codec or "").lower()
@@ -440,28 +557,12 @@ class InteractiveConverter:
             codec_l = "srt"
         output_args[f"c:s:{output_index}"] = codec_l
 
-    def _process_video_stream(self, input_stream, track_index: int, codec: str):
-        """Process video stream with codec conversion."""
-        try:
-            return input_stream[str(track_index)]  # Use direct indexing by stream index
-        except Exception as e:
-            console.print(f"[bold yellow]Warning: Could not process video stream {track_index}: {e}[/bold yellow]")
-            return input_stream[str(track_index)]
-            
-    def _process_audio_stream(self, input_stream, track_index: int, codec: str):
-        """Process audio stream with codec conversion."""
-        try:
-            return input_stream[str(track_index)]  # Use direct indexing by stream index
-        except Exception as e:
-            console.print(f"[bold yellow]Warning: Could not process audio stream {track_index}: {e}[/bold yellow]")
-            return input_stream[str(track_index)]
-            
-    def _process_subtitle_stream(self, input_stream, track_index: int, codec: str):
-        """Process subtitle stream with codec conversion."""
+    def _process_stream(self, input_stream, track_index: int, track_type: str):
+        """Select an input stream by its stream index."""
         try:
             return input_stream[str(track_index)]  # Use direct indexing by stream index
         except Exception as e:
-            console.print(f"[bold yellow]Warning: Could not process subtitle stream {track_index}: {e}[/bold yellow]")
+            console.print(f"[bold yellow]Warning: Could not process {track_type} stream {track_index}: {e}[/bold yellow]")
             return input_stream[str(track_index)]
             
     def convert_file(self):
@@ -484,16 +585,15 @@ class InteractiveConverter:
                 
             # Generate ffmpeg command
             console.print("\n[bold cyan]Generating ffmpeg command...[/bold cyan]")
-            ffmpeg_command = self.generate_ffmpeg_command()
+            argv = self.build_argv()
             
-            if not ffmpeg_command:
+            if not argv:
                 console.print("[bold red]Failed to generate ffmpeg command[/bold red]")
-                questionary.press_any_key_to_continue().ask()
+                press_any_key_to_continue()
                 return False
             
             # Show and get approval for the command before execution
-            command_args = ' '.join(ffmpeg_command.get_args())
-            full_command = f"ffmpeg {command_args}"
+            full_command = ' '.join(argv)
             
             console.print("\n[bold]Generated FFmpeg Command:[/bold]")
             console.print(f"[yellow]{full_command}[/yellow]")
@@ -508,26 +608,26 @@ class InteractiveConverter:
                 return False
                 
             # Execute conversion
-            result = run_command(ffmpeg_command, f"Converting {os.path.basename(self.file_path)}...", show_progress=True)
+            result = run_argv(argv, f"Converting {os.path.basename(self.file_path)}...", show_progress=True)
             if result is not None:  # Success or user cancelled during execution
                 if result:  # Success
                     console.print(f"[bold green]Successfully converted to {self.output_path}[/bold green]")
                 else:  # Failed
                     console.print("[bold red]Conversion failed[/bold red]")
-                questionary.press_any_key_to_continue().ask()
+                press_any_key_to_continue()
                 return result is not None
             else:  # User cancelled during conversion
                 console.print("\n[bold yellow]Operation cancelled by user.[/bold yellow]")
                 return False
         except KeyboardInterrupt:
             console.print("\n[bold yellow]Operation cancelled by user.[/bold yellow]")
-            questionary.press_any_key_to_continue().ask()
+            press_any_key_to_continue()
             return False
 
 
-def convert_file_interactive(file_path: str):
+def convert_file_interactive(file_path: str, info: Optional[MediaInfo] = None):
     """Main entry point for interactive conversion."""
-    converter = InteractiveConverter(file_path)
+    converter = InteractiveConverter(file_path, info)
     result = converter.convert_file()
     
     # If the result indicates we should quit to main menu, propagate this
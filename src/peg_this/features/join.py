@@ -6,11 +6,14 @@ import ffmpeg
 import questionary
 from rich.console import Console
 
-from peg_this.utils.ffmpeg_utils import run_command
-from peg_this.utils.ui_utils import get_media_files
+from peg_this.utils.ffmpeg_utils import run_command, MediaInfo
+from peg_this.utils.ui_utils import get_media_files, press_any_key_to_continue
 
 console = Console()
 
+# Media files that can be offered for joining
+VIDEO_EXTENSIONS = frozenset((".mp4", ".mkv", ".mov", ".avi", ".webm"))
+
 
 def join_videos(directory="."):
     """Join multiple videos into a single file after standardizing their resolutions and sample rates."""
@@ -22,7 +25,7 @@ def join_videos(directory="."):
         directory = os.path.abspath(os.path.expanduser(directory))
 
         media_files = get_media_files(directory)
-        video_files = [f for f in media_files if Path(f).suffix.lower() in [".mp4", ".mkv", ".mov", ".avi", ".webm"]]
+        video_files = [f for f in media_files if Path(f).suffix.lower() in VIDEO_EXTENSIONS]
 
         if len(video_files) < 2:
             console.print(f"[bold yellow]Not enough video files in '{directory}' to join.[/bold yellow]")
@@ -34,6 +37,9 @@ def join_videos(directory="."):
             console.print("[bold yellow]Joining cancelled. At least two videos must be selected.[/bold yellow]")
             return
 
+        # Probe the first video (which sets the target parameters) while the output name is entered
+        first_video_info = MediaInfo(os.path.abspath(os.path.join(directory, selected_videos[0]))).prefetch()
+
         console.print("Videos will be joined in this order:")
         for i, video in enumerate(selected_videos):
             console.print(f"  {i+1}. {video}")
@@ -45,8 +51,7 @@ def join_videos(directory="."):
             output_path = os.path.join(directory, output_file)
 
         try:
-            first_video_path = os.path.abspath(os.path.join(directory, selected_videos[0]))
-            probe = ffmpeg.probe(first_video_path)
+            probe = first_video_info.probe
             video_info = next(s for s in probe['streams'] if s['codec_type'] == 'video')
             audio_info = next(s for s in probe['streams'] if s['codec_type'] == 'audio')
             
@@ -90,4 +95,4 @@ def join_videos(directory="."):
         console.print("\n[bold yellow]Operation cancelled by user.[/bold yellow]")
         return
     finally:
-        questionary.press_any_key_to_continue().ask()
+        press_any_key_to_continue()
@@ -6,6 +6,7 @@ import questionary
 from rich.console import Console
 
 from peg_this.utils.ffmpeg_utils import run_command
+from peg_this.utils.ui_utils import press_any_key_to_continue
 
 console = Console()
 
@@ -28,4 +29,4 @@ def trim_video(file_path):
         console.print("\n[bold yellow]Operation cancelled by user.[/bold yellow]")
         return
     finally:
-        questionary.press_any_key_to_continue().ask()
+        press_any_key_to_continue()
@@ -1,5 +1,6 @@
 import os
 import sys
+import argparse
 import logging
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
@@ -7,23 +8,17 @@ import questionary
 from rich.console import Console
 
 from peg_this.features.audio import extract_audio
+from peg_this.features.batch import PRESETS, batch_convert_parallel, load_track_actions, process_preset
 from peg_this.features.interactive_convert import convert_file_interactive
 from peg_this.features.inspect import inspect_file
 from peg_this.features.join import join_videos
 from peg_this.features.trim import trim_video
-from peg_this.utils.ffmpeg_utils import check_ffmpeg_ffprobe
+from peg_this.utils.ffmpeg_utils import check_ffmpeg_ffprobe, MediaInfo
+from peg_this.utils.log_utils import LOG_FILE, setup_logging
 from peg_this.utils.ui_utils import select_media_file
 
 # --- Global Configuration ---
-# Configure logging
-log_file = os.path.join(os.path.dirname(os.path.realpath(__file__)), "ffmpeg_log.txt")
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler(log_file, mode='w') # Overwrite log on each run
-    ]
-)
+# Logging is configured in main() (see setup_logging), so importing this module has no side effects
 
 # Initialize Rich Console
 console = Console()
@@ -32,6 +27,8 @@ console = Console()
 
 def action_menu(file_path):
     """Display the menu of actions for a selected file."""
+    # Probed in the background while the menu is shown, and shared by every action on this file
+    info = MediaInfo(file_path).prefetch()
     while True:
         console.rule(f"[bold]Actions for: {os.path.basename(file_path)}[/bold]")
         action = questionary.select(
@@ -51,15 +48,15 @@ def action_menu(file_path):
             break
 
         actions = {
-            "Inspect File Details": inspect_file,
-            "Modify Tracks": convert_file_interactive,
-            "Trim Video": trim_video,
-            "Extract Audio": extract_audio,
+            "Inspect File Details": lambda: inspect_file(file_path, info=info),
+            "Modify Tracks": lambda: convert_file_interactive(file_path, info=info),
+            "Trim Video": lambda: trim_video(file_path),
+            "Extract Audio": lambda: extract_audio(file_path, info=info),
         }
         # Ensure we have a valid action before calling
         if action in actions:
             try:
-                result = actions[action](file_path)
+                result = actions[action]()
                 # If the action returns "quit_to_main", we should return to main menu
                 if result == "quit_to_main":
                     return
@@ -98,16 +95,67 @@ def main_menu():
                 console.print("\n[bold yellow]Operation cancelled by user.[/bold yellow]")
 
 
+def parse_args(argv=None):
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(prog="peg_this", description="A powerful and intuitive command-line video editor, built on FFmpeg.")
+    parser.add_argument("input_path", nargs="?", help="media file to process, or a folder of videos to join")
+    parser.add_argument("--batch", metavar="DIR", help="convert every media file under DIR in parallel, without prompts")
+    parser.add_argument("--actions", metavar="JSON_FILE", help="track actions preset applied to every file in batch mode")
+    parser.add_argument("--jobs", metavar="N", type=int, help="number of files to convert in parallel (default: CPU count)")
+    parser.add_argument("--pin-cores", action="store_true", help="pin each parallel job to its own CPU cores (Linux only)")
+    parser.add_argument("--preset", choices=sorted(PRESETS), help="convert with a fixed output profile instead of the track menus")
+    args = parser.parse_args(argv)
+
+    if args.jobs is not None and args.jobs < 1:
+        parser.error("--jobs must be at least 1")
+    if args.batch and args.input_path:
+        parser.error("--batch cannot be combined with an input path")
+    if not args.batch and (args.actions or args.jobs or args.pin_cores):
+        parser.error("--actions, --jobs and --pin-cores require --batch")
+    if args.preset and args.actions:
+        parser.error("--preset cannot be combined with --actions")
+    if args.batch and not (args.actions or args.preset):
+        parser.error("--batch requires --actions or --preset")
+    if args.preset and not args.batch and not (args.input_path and os.path.isfile(args.input_path)):
+        parser.error("--preset requires --batch or an input file")
+    return args
+
+
 def main():
     """Main entry point for the application script."""
+    setup_logging(LOG_FILE, mode='w')  # Overwrite log on each run
     try:
-        # Check command line arguments
-        if len(sys.argv) == 1:
+        args = parse_args()
+
+        if args.batch:
+            if not os.path.isdir(args.batch):
+                console.print(f"[bold red]Error: Directory '{args.batch}' does not exist.[/bold red]")
+                return
+
+            actions_json = None
+            if args.actions:
+                with open(args.actions, encoding='utf-8') as f:
+                    actions_json = f.read()
+                try:
+                    load_track_actions(actions_json)
+                except ValueError as e:
+                    console.print(f"[bold red]Error: Invalid track actions preset '{args.actions}': {e}[/bold red]")
+                    return
+
+            check_ffmpeg_ffprobe()
+            batch_convert_parallel(args.batch, actions_json, args.jobs, args.preset, args.pin_cores)
+        elif args.preset:
+            check_ffmpeg_ffprobe()
+            if process_preset(args.input_path, args.preset, show_progress=True):
+                console.print(f"[bold green]Successfully converted {os.path.basename(args.input_path)}[/bold green]")
+            else:
+                console.print(f"[bold red]Failed to convert {os.path.basename(args.input_path)}[/bold red]")
+        elif args.input_path is None:
             # No arguments provided, show main menu
             main_menu()
-        elif len(sys.argv) == 2:
+        else:
             # One argument provided: treat as a file path (process) or directory (join)
-            input_path = sys.argv[1]
+            input_path = args.input_path
 
             if os.path.isdir(input_path):
                 console.print(f"[bold green]Joining videos in: {os.path.abspath(input_path)}[/bold green]")
@@ -124,17 +172,13 @@ def main():
             # Skip the main menu and go directly to action menu for the provided file
             console.print(f"[bold green]Processing file: {os.path.basename(file_path)}[/bold green]")
             action_menu(file_path)
-        else:
-            # More than one argument provided, show an error
-            console.print(f"[bold red]Error: Too many arguments provided. Usage: {sys.argv[0]} [optional_file_or_folder][/bold red]")
-            return
     except (KeyboardInterrupt, EOFError):
         logging.info("Operation cancelled by user.")
         console.print("[bold]Operation cancelled. Goodbye![/bold]")
     except Exception as e:
         logging.exception("An unexpected error occurred.")
         console.print(f"[bold red]An unexpected error occurred: {e}[/bold red]")
-        console.print(f"Details have been logged to {log_file}")
+        console.print(f"Details have been logged to {LOG_FILE}")
 
 if __name__ == "__main__":
     main()
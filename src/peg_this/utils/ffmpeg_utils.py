@@ -1,14 +1,60 @@
 
+import os
 import subprocess
 import logging
 import sys
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
 import ffmpeg
 from rich.console import Console
 from rich.progress import Progress, SpinnerColumn, BarColumn, TextColumn
 
+from peg_this.utils.ffprobe_cache import probe_cached
+
 console = Console()
 
+# Hardware video encoders offered in the codec picker when ffmpeg supports them
+HW_VIDEO_ENCODERS = {
+    'h264_nvenc': 'h264_nvenc (NVIDIA H.264)',
+    'hevc_nvenc': 'hevc_nvenc (NVIDIA H.265/HEVC)',
+    'h264_qsv': 'h264_qsv (Intel QSV H.264)',
+    'hevc_vaapi': 'hevc_vaapi (VAAPI H.265/HEVC)',
+    'h264_videotoolbox': 'h264_videotoolbox (Apple H.264)',
+}
+
+# Codec names ffprobe reports for streams written by each encoder, where they differ
+ENCODER_CODEC_NAMES = {
+    'libx264': 'h264',
+    'libx265': 'hevc',
+    'libvpx-vp9': 'vp9',
+    'libaom-av1': 'av1',
+    'libvpx': 'vp8',
+    'libmp3lame': 'mp3',
+    'libfdk_aac': 'aac',
+    'libopus': 'opus',
+    'libflac': 'flac',
+    'libvorbis': 'vorbis',
+    'h264_nvenc': 'h264',
+    'hevc_nvenc': 'hevc',
+    'h264_qsv': 'h264',
+    'hevc_vaapi': 'hevc',
+    'h264_videotoolbox': 'h264',
+    'srt': 'subrip',
+}
+
+# Render node used for VAAPI hardware encoding
+VAAPI_DEVICE = "/dev/dri/renderD128"
+
+_hw_encoders = None
+
+# Buffer size, in the kernel and in Python, for the pipes carrying ffmpeg's progress output
+PIPE_BUFFER_SIZE = 1 << 20
+
+# Runs ffprobe in the background while the user is still navigating menus
+_EXECUTOR = ThreadPoolExecutor(max_workers=2)
+
 
 def calculate_fps_from_frame_rate(frame_rate_str):
     """
@@ -50,38 +96,165 @@ def check_ffmpeg_ffprobe():
         sys.exit(1)
 
 
+def probe_hw_encoders():
+    """
+    Return the hardware video encoders that work with the installed ffmpeg and hardware.
+    ffmpeg lists every encoder compiled in, so each listed one is tried on a single test
+    frame. The result is probed once and cached for the rest of the session.
+    """
+    global _hw_encoders
+    if _hw_encoders is None:
+        try:
+            result = subprocess.run(
+                ['ffmpeg', '-hide_banner', '-encoders'],
+                stdout=subprocess.PIPE,
+                stderr=subprocess.DEVNULL,
+                universal_newlines=True,
+                check=True
+            )
+            # Encoder lines look like " V....D h264_nvenc   NVIDIA NVENC H.264 encoder"
+            available = {line.split()[1] for line in result.stdout.splitlines() if len(line.split()) > 1}
+        except (OSError, subprocess.CalledProcessError) as e:
+            logging.warning(f"Could not list ffmpeg encoders: {e}")
+            available = set()
+        _hw_encoders = frozenset(
+            name for name in HW_VIDEO_ENCODERS if name in available and _hw_encoder_works(name)
+        )
+    return _hw_encoders
+
+
+def _hw_encoder_works(encoder):
+    """Encode one blank frame with a hardware encoder to check the device behind it is usable."""
+    argv = ['ffmpeg', '-hide_banner', '-v', 'error']
+    if encoder.endswith('_vaapi'):
+        argv += ['-vaapi_device', VAAPI_DEVICE]
+    argv += ['-f', 'lavfi', '-i', 'nullsrc', '-frames:v', '1']
+    if encoder.endswith('_vaapi'):
+        argv += ['-vf', 'format=nv12,hwupload']
+    argv += ['-c:v', encoder, '-f', 'null', '-']
+    try:
+        subprocess.run(argv, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, timeout=15, check=True)
+    except subprocess.CalledProcessError as e:
+        logging.info(f"Hardware encoder {encoder} is not usable: {e.stderr.decode(errors='replace').strip()}")
+        return False
+    except (OSError, subprocess.TimeoutExpired) as e:
+        logging.info(f"Hardware encoder {encoder} is not usable: {e}")
+        return False
+    return True
+
+
+def enlarge_pipe(pipe, size=PIPE_BUFFER_SIZE):
+    """
+    Grow the kernel buffer of a pipe (Linux only) so ffmpeg's progress output
+    is read in fewer, larger chunks. Failures are harmless and only logged.
+    """
+    try:
+        import fcntl
+    except ImportError:
+        return
+    # fcntl.F_SETPIPE_SZ is only exposed since Python 3.10
+    set_pipe_size = getattr(fcntl, 'F_SETPIPE_SZ', 1031 if sys.platform.startswith('linux') else None)
+    if set_pipe_size is None:
+        return
+    try:
+        fcntl.fcntl(pipe.fileno(), set_pipe_size, size)
+    except OSError as e:
+        # EPERM when size is above /proc/sys/fs/pipe-max-size for unprivileged users
+        logging.debug(f"Could not enlarge pipe buffer to {size} bytes: {e}")
+
+
+def option_args(options):
+    """
+    Turn a dict of ffmpeg options into arguments, e.g. {'c:v': 'libx264', 'y': None}
+    becomes ['-c:v', 'libx264', '-y']. Options are sorted by name and a None value
+    gives a bare flag, the same as ffmpeg-python does for keyword arguments.
+    A list value repeats the option, e.g. {'map': ['0', '-0:d?']} gives ['-map', '0', '-map', '-0:d?'].
+    """
+    args = []
+    for name in sorted(options):
+        values = options[name] if isinstance(options[name], list) else [options[name]]
+        for value in values:
+            args.append(f'-{name}')
+            if value is not None:
+                args.append(str(value))
+    return args
+
+
+def _stderr_time(line):
+    """Elapsed output time in seconds from an ffmpeg stats line ("... time=00:01:02.50 ..."), or None."""
+    if "time=" not in line:
+        return None
+    try:
+        time_str = line.split("time=")[1].split(" ")[0].strip()
+        h, m, s_parts = time_str.split(':')
+        return int(h) * 3600 + int(m) * 60 + float(s_parts)
+    except ValueError:
+        return None
+
+
+def _progress_pipe_time(line):
+    """Elapsed output time in seconds from a "-progress" line ("out_time_us=62500000"), or None."""
+    key, _, value = line.partition(b'=')
+    if key != b'out_time_us':
+        return None
+    try:
+        return int(value) / 1_000_000
+    except ValueError:
+        # "N/A" until the first frame is written
+        return None
+
+
+def _log_stderr(stderr):
+    """Drain ffmpeg's stderr into the log so the process never blocks on a full pipe."""
+    for line in stderr:
+        logging.debug(f"ffmpeg stderr: {line.strip()}")
+
+
 def run_command(stream_spec, description="Processing...", show_progress=False):
     """
-    Runs an ffmpeg command using ffmpeg-python.
+    Runs an ffmpeg command built with ffmpeg-python. See run_argv.
+    """
+    return run_argv(['ffmpeg'] + stream_spec.get_args(), description, show_progress)
+
+
+def run_argv(argv, description="Processing...", show_progress=False, quiet=False):
+    """
+    Runs an ffmpeg command given as an argument list, starting with 'ffmpeg'.
     - For simple commands, it runs directly.
-    - For commands with a progress bar, it generates the ffmpeg arguments,
-      runs them as a subprocess, and parses stderr to show progress,
-      mimicking the logic from the original script for accuracy.
+    - For commands with a progress bar, it runs them as a subprocess and
+      follows ffmpeg's -progress output (stderr stats where that isn't available).
+    - quiet commands only write to the log, never to the console, for batch
+      worker processes whose output would garble the parent's progress display.
+      They never show a progress bar.
     """
-    console.print(f"[bold cyan]{description}[/bold cyan]")
+    if quiet:
+        show_progress = False
+    else:
+        console.print(f"[bold cyan]{description}[/bold cyan]")
     
-    # Get the full command arguments from the ffmpeg-python stream object
-    args = stream_spec.get_args()
-    full_command = ['ffmpeg'] + args
+    full_command = list(argv)
     logging.info(f"Executing command: {' '.join(full_command)}")
 
     if not show_progress:
         try:
-            # Use ffmpeg.run() for simple, non-progress tasks. It's cleaner.
-            out, err = ffmpeg.run(stream_spec, capture_stdout=True, capture_stderr=True, quiet=True)
+            process = subprocess.run(full_command, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+            if process.returncode != 0:
+                raise ffmpeg.Error('ffmpeg', process.stdout, process.stderr)
             logging.info("Command successful (no progress bar).")
-            return out.decode('utf-8')
+            return process.stdout.decode('utf-8')
         except ffmpeg.Error as e:
-            error_message = e.stderr.decode('utf-8')
-            console.print("[bold red]An error occurred:[/bold red]")
-            console.print(error_message)
+            error_message = e.stderr.decode('utf-8', errors='replace')
+            if not quiet:
+                console.print("[bold red]An error occurred:[/bold red]")
+                console.print(error_message)
             logging.error(f"ffmpeg error:{error_message}")
             return None
         except KeyboardInterrupt:
-            console.print("\n[bold yellow]Operation cancelled by user.[/bold yellow]")
+            if not quiet:
+                console.print("\n[bold yellow]Operation cancelled by user.[/bold yellow]")
             return None
     else:
-        # For the progress bar, we must run ffmpeg as a subprocess and parse stderr.
+        # For the progress bar, we must run ffmpeg as a subprocess and follow its progress output.
         duration = 0
         try:
             # Find the primary input file from the command arguments to probe it.
@@ -93,7 +266,7 @@ def run_command(stream_spec, description="Processing...", show_progress=False):
                     break
             
             if input_file_path:
-                probe_info = ffmpeg.probe(input_file_path)
+                probe_info = probe_cached(input_file_path)
                 duration = float(probe_info['format']['duration'])
             else:
                 logging.warning("Could not find input file in command to determine duration for progress bar.")
@@ -110,29 +283,53 @@ def run_command(stream_spec, description="Processing...", show_progress=False):
             console=console,
         ) as progress:
             task = progress.add_task(description, total=100)
-            
+
+            # ffmpeg reports progress as key=value lines on a pipe of its own, so stderr
+            # only carries log messages. pass_fds is POSIX only; elsewhere stderr is scraped.
+            use_progress_pipe = os.name == 'posix'
+            if use_progress_pipe:
+                read_fd, write_fd = os.pipe()
+                full_command = full_command[:1] + ['-progress', f'pipe:{write_fd}', '-nostats'] + full_command[1:]
+
             # Run the command as a subprocess to capture stderr in real-time
-            process = subprocess.Popen(
-                full_command,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                universal_newlines=True,
-                encoding='utf-8'
-            )
+            try:
+                process = subprocess.Popen(
+                    full_command,
+                    stdout=subprocess.PIPE,
+                    stderr=subprocess.PIPE,
+                    bufsize=PIPE_BUFFER_SIZE,
+                    universal_newlines=True,
+                    encoding='utf-8',
+                    errors='replace',  # ffmpeg prints metadata in whatever encoding the file uses
+                    **({'pass_fds': (write_fd,)} if use_progress_pipe else {})
+                )
+            except OSError:
+                if use_progress_pipe:
+                    os.close(read_fd)
+                raise
+            finally:
+                if use_progress_pipe:
+                    # Only ffmpeg keeps the write end open, so reading stops when it exits
+                    os.close(write_fd)
+            if use_progress_pipe:
+                stderr_logger = threading.Thread(target=_log_stderr, args=(process.stderr,), daemon=True)
+                stderr_logger.start()
+                lines = os.fdopen(read_fd, 'rb', buffering=PIPE_BUFFER_SIZE)
+                enlarge_pipe(lines)
+                parse_elapsed = _progress_pipe_time
+            else:
+                lines = process.stderr
+                enlarge_pipe(lines)
+                parse_elapsed = _stderr_time
 
             try:
-                for line in process.stderr:
-                    logging.debug(f"ffmpeg stderr: {line.strip()}")
-                    if "time=" in line and duration > 0:
-                        try:
-                            time_str = line.split("time=")[1].split(" ")[0].strip()
-                            h, m, s_parts = time_str.split(':')
-                            s = float(s_parts)
-                            elapsed_time = int(h) * 3600 + int(m) * 60 + s
-                            percent_complete = (elapsed_time / duration) * 100
-                            progress.update(task, completed=min(percent_complete, 100))
-                        except Exception:
-                            pass # Ignore any parsing errors
+                for line in lines:
+                    if not use_progress_pipe:
+                        logging.debug(f"ffmpeg stderr: {line.strip()}")
+                    elapsed_time = parse_elapsed(line)
+                    if elapsed_time is not None and duration > 0:
+                        percent_complete = (elapsed_time / duration) * 100
+                        progress.update(task, completed=min(percent_complete, 100))
             except KeyboardInterrupt:
                 # Handle Ctrl+C by terminating the process
                 console.print("\n[bold yellow]Operation cancelled by user. Terminating ffmpeg process...[/bold yellow]")
@@ -142,8 +339,15 @@ def run_command(stream_spec, description="Processing...", show_progress=False):
                 except subprocess.TimeoutExpired:
                     process.kill()  # Force kill if it doesn't terminate gracefully
                 return None
+            finally:
+                if use_progress_pipe:
+                    lines.close()
 
             process.wait()
+            if use_progress_pipe:
+                stderr_logger.join()
+            process.stdout.close()
+            process.stderr.close()
             progress.update(task, completed=100)
             
             if process.returncode != 0:
@@ -156,69 +360,142 @@ def run_command(stream_spec, description="Processing...", show_progress=False):
         return "Success"
 
 
+class MediaInfo:
+    """
+    Lazily probed media file information, shared by the actions run on one file
+    so the file is probed at most once.
+    """
+
+    def __init__(self, file_path):
+        self.file_path = file_path
+        self._probe = None
+        self._probe_future = None
+        self._tracks = None
+
+    def prefetch(self, executor=None):
+        """Start probing the file in the background so the result is ready when first needed."""
+        if self._probe is None and self._probe_future is None:
+            self._probe_future = (executor or _EXECUTOR).submit(probe_cached, self.file_path)
+        return self
+
+    @property
+    def probe(self):
+        """The raw ffprobe output. Raises ffmpeg.Error if the file can't be probed."""
+        if self._probe is None:
+            if self._probe_future is not None:
+                self._probe = self._probe_future.result()
+            else:
+                self._probe = probe_cached(self.file_path)
+        return self._probe
+
+    @property
+    def streams(self):
+        return self.probe.get('streams', [])
+
+    @property
+    def video_streams(self):
+        return [s for s in self.streams if s.get('codec_type') == 'video']
+
+    @property
+    def audio_streams(self):
+        return [s for s in self.streams if s.get('codec_type') == 'audio']
+
+    def has_audio(self):
+        """Check if the media file has an audio stream."""
+        try:
+            return bool(self.audio_streams)
+        except ffmpeg.Error:
+            return False
+
+    @property
+    def tracks(self):
+        """All tracks (video, audio, subtitle) of the media file, or [] if it can't be probed."""
+        if self._tracks is None:
+            try:
+                self._tracks = _tracks_from_streams(self.streams)
+            except ffmpeg.Error as e:
+                console.print(f"[bold red]Error parsing media tracks: {e}[/bold red]")
+                return []
+        return self._tracks
+
+
 def has_audio_stream(file_path):
     """Check if the media file has an audio stream."""
-    try:
-        probe = ffmpeg.probe(file_path, select_streams='a')
-        return 'streams' in probe and len(probe['streams']) > 0
-    except ffmpeg.Error:
-        return False
+    return MediaInfo(file_path).has_audio()
 
 
 def parse_media_tracks(file_path):
     """Parse all tracks (video, audio, subtitle) from a media file."""
-    try:
-        probe = ffmpeg.probe(file_path)
-        tracks = []
-        
-        for stream in probe.get('streams', []):
-            track_type = stream.get('codec_type', 'unknown')
-            if track_type in ['video', 'audio', 'subtitle']:
-                track_info = {
-                    'index': stream.get('index', 0),
-                    'type': track_type,
-                    'codec': stream.get('codec_name', 'unknown'),
-                    'codec_long': stream.get('codec_long_name', 'unknown'),
-                    'disposition': stream.get('disposition', {}),
-                    'tags': stream.get('tags', {}),
-                }
-                
-                # Add type-specific information
-                if track_type == 'video':
-                    track_info.update({
-                        'width': stream.get('width', 0),
-                        'height': stream.get('height', 0),
-                        'duration': stream.get('duration', 0),
-                        'fps': calculate_fps_from_frame_rate(stream.get('r_frame_rate', '0/1')),
-                        'bit_rate': stream.get('bit_rate', 'unknown'),
-                        'profile': stream.get('profile', 'unknown'),
-                        'level': stream.get('level', 'unknown'),
-                    })
-                elif track_type == 'audio':
-                    track_info.update({
-                        'channels': stream.get('channels', 0),
-                        'sample_rate': stream.get('sample_rate', 0),
-                        'duration': stream.get('duration', 0),
-                        'bit_rate': stream.get('bit_rate', 'unknown'),
-                        'language': stream.get('tags', {}).get('language', 'und'),
-                        'title': stream.get('tags', {}).get('title', ''),
-                    })
-                elif track_type == 'subtitle':
-                    track_info.update({
-                        'language': stream.get('tags', {}).get('language', 'und'),
-                        'title': stream.get('tags', {}).get('title', ''),
-                    })
-                
-                tracks.append(track_info)
-        
-        return tracks
-    except ffmpeg.Error as e:
-        console.print(f"[bold red]Error parsing media tracks: {e}[/bold red]")
-        return []
+    return MediaInfo(file_path).tracks
 
 
+def parse_media_tracks_many(paths, workers=None):
+    """
+    Probe many media files concurrently, yielding (path, MediaInfo) pairs in completion order.
+    Probes run in threads since the work happens in the ffprobe subprocesses.
+    """
+    with ThreadPoolExecutor(max_workers=workers or os.cpu_count() or 1) as executor:
+        futures = {}
+        for path in paths:
+            info = MediaInfo(path).prefetch(executor)
+            futures[info._probe_future] = (path, info)
+        for future in as_completed(futures):
+            yield futures[future]
+
+
+def _tracks_from_streams(streams):
+    """Build track descriptions from ffprobe stream entries."""
+    tracks = []
+    
+    for stream in streams:
+        track_type = stream.get('codec_type', 'unknown')
+        if track_type in ['video', 'audio', 'subtitle']:
+            track_info = {
+                'index': stream.get('index', 0),
+                'type': track_type,
+                'codec': stream.get('codec_name', 'unknown'),
+                'codec_long': stream.get('codec_long_name', 'unknown'),
+                'disposition': stream.get('disposition', {}),
+                'tags': stream.get('tags', {}),
+            }
+            
+            # Add type-specific information
+            if track_type == 'video':
+                track_info.update({
+                    'width': stream.get('width', 0),
+                    'height': stream.get('height', 0),
+                    'duration': stream.get('duration', 0),
+                    'fps': calculate_fps_from_frame_rate(stream.get('r_frame_rate', '0/1')),
+                    'bit_rate': stream.get('bit_rate', 'unknown'),
+                    'profile': stream.get('profile', 'unknown'),
+                    'level': stream.get('level', 'unknown'),
+                })
+            elif track_type == 'audio':
+                track_info.update({
+                    'channels': stream.get('channels', 0),
+                    'sample_rate': stream.get('sample_rate', 0),
+                    'duration': stream.get('duration', 0),
+                    'bit_rate': stream.get('bit_rate', 'unknown'),
+                    'language': stream.get('tags', {}).get('language', 'und'),
+                    'title': stream.get('tags', {}).get('title', ''),
+                })
+            elif track_type == 'subtitle':
+                track_info.update({
+                    'language': stream.get('tags', {}).get('language', 'und'),
+                    'title': stream.get('tags', {}).get('title', ''),
+                })
+            
+            tracks.append(track_info)
+    
+    return tracks
+
+
+@functools.lru_cache(maxsize=None)
 def get_codec_options(track_type):
-    """Get available codec options for a specific track type."""
+    """
+    Get available codec options for a specific track type.
+    The options are computed once per track type and returned as a tuple, since the cached value is shared.
+    """
     codec_options = {
         'video': [
             'libx264 (H.264)',
@@ -242,9 +519,14 @@ def get_codec_options(track_type):
             'mov_text (MP4)'
         ]
     }
-    return codec_options.get(track_type, [])
+    options = codec_options.get(track_type, [])
+    if track_type == 'video':
+        hw_encoders = probe_hw_encoders()
+        options += [label for name, label in HW_VIDEO_ENCODERS.items() if name in hw_encoders]
+    return tuple(options)
 
 
+@functools.lru_cache(maxsize=None)
 def get_default_codec(track_type):
     """Get default codec for a track type."""
     defaults = {
@@ -0,0 +1,89 @@
+import os
+import json
+import hashlib
+import logging
+import tempfile
+import functools
+import subprocess
+from pathlib import Path
+
+import ffmpeg
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Parsed ffprobe output is stored here, one JSON file per (path, mtime, size)
+CACHE_DIR = Path(os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache") / "peg_this" / "probes"
+
+
+def probe_cached(file_path):
+    """
+    Return the ffprobe output for a media file, reusing earlier results while the file is unchanged.
+    Results are kept in memory for the session and on disk across sessions.
+    The returned dict is shared between callers and must not be modified.
+    """
+    abspath = os.path.abspath(file_path)
+    try:
+        st = os.stat(abspath)
+    except OSError:
+        # Let ffprobe report the problem the same way an uncached probe would
+        return _fast_probe(file_path)
+    return _probe(abspath, st.st_mtime_ns, st.st_size)
+
+
+@functools.lru_cache(maxsize=64)
+def _probe(abspath, mtime_ns, size):
+    key = f"{abspath}:{mtime_ns}:{size}"
+    cache_file = CACHE_DIR / f"{hashlib.blake2b(key.encode('utf-8')).hexdigest()}.json"
+
+    try:
+        with open(cache_file, 'rb') as f:
+            return _loads(f.read())
+    except (OSError, ValueError):
+        pass
+
+    probe = _fast_probe(abspath)
+    _write_cache(cache_file, probe)
+    return probe
+
+
+def _loads(data):
+    return orjson.loads(data) if orjson is not None else json.loads(data)
+
+
+def _fast_probe(file_path):
+    """
+    Run ffprobe and parse its JSON output with orjson, which is several times faster
+    than the stdlib on large outputs. Falls back to ffmpeg.probe when orjson is not installed.
+    """
+    if orjson is None:
+        return ffmpeg.probe(file_path)
+
+    process = subprocess.Popen(
+        ['ffprobe', '-v', 'error', '-print_format', 'json', '-show_format', '-show_streams', file_path],
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE
+    )
+    out, err = process.communicate()
+    if process.returncode != 0:
+        # Raise the same error type as ffmpeg.probe so callers handle both paths alike
+        raise ffmpeg.Error('ffprobe', out, err)
+    return orjson.loads(out)
+
+
+def _write_cache(cache_file, probe):
+    """Atomically write a probe result, ignoring failures (e.g. a read-only home directory)."""
+    try:
+        cache_file.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=cache_file.parent, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(probe, f)
+            os.replace(tmp_path, cache_file)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+    except OSError as e:
+        logging.warning(f"Could not write ffprobe cache {cache_file}: {e}")
@@ -0,0 +1,21 @@
+import os
+import logging
+
+# Written next to the package, see setup_logging
+LOG_FILE = os.path.join(os.path.dirname(os.path.dirname(os.path.realpath(__file__))), "ffmpeg_log.txt")
+LOG_FORMAT = '%(asctime)s - %(levelname)s - %(message)s'
+
+
+def setup_logging(log_file=LOG_FILE, mode='w'):
+    """
+    Send log records to log_file. The app truncates the log on each run (mode 'w');
+    batch worker processes append to the same file (mode 'a').
+    Does nothing if logging is already configured, e.g. in a forked worker.
+    """
+    logging.basicConfig(
+        level=logging.INFO,
+        format=LOG_FORMAT,
+        handlers=[
+            logging.FileHandler(log_file, mode=mode)
+        ]
+    )
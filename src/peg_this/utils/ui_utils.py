@@ -1,29 +1,42 @@
 
 import os
-from pathlib import Path
+import sys
 
 import questionary
 from rich.console import Console
 
 console = Console()
 
+MEDIA_EXTENSIONS = frozenset((".mkv", ".mp4", ".avi", ".mov", ".webm", ".flv", ".wmv", ".mp3", ".flac", ".wav", ".ogg", ".gif"))
+
+
+def press_any_key_to_continue():
+    """Wait for a key press, skipping the prompt when stdin is not an interactive terminal."""
+    if sys.stdin is not None and sys.stdin.isatty():
+        questionary.press_any_key_to_continue().ask()
+
 
 def get_media_files(directory="."):
-    """Scan a directory for media files."""
-    media_extensions = [".mkv", ".mp4", ".avi", ".mov", ".webm", ".flv", ".wmv", ".mp3", ".flac", ".wav", ".ogg", ".gif"]
-    if not os.path.isdir(directory):
+    """Scan a directory for media files, sorted by name regardless of case."""
+    try:
+        # scandir gets the file type with the directory listing, so most entries need no stat call
+        with os.scandir(directory) as entries:
+            files = [entry.name for entry in entries if _is_media_name(entry.name) and entry.is_file()]
+    except (FileNotFoundError, NotADirectoryError):
         return []
-    files = [
-        f
-        for f in os.listdir(directory)
-        if os.path.isfile(os.path.join(directory, f)) and Path(f).suffix.lower() in media_extensions
-    ]
-    return files
+    return sorted(files, key=str.lower)
+
+
+def _is_media_name(name):
+    """Check the file extension without building a Path (dotfiles like ".mp4" have no extension)."""
+    dot = name.rfind(".")
+    return dot > 0 and name[dot:].lower() in MEDIA_EXTENSIONS
 
 
 def select_media_file(directory="."):
     """Display a menu to select a media file."""
-    media_files = get_media_files(directory)
+    abs_dir = os.path.abspath(directory)
+    media_files = get_media_files(abs_dir)
     if not media_files:
         console.print("[bold yellow]No media files found in this directory.[/bold yellow]")
         manual_path = questionary.text("Enter the path to a media file (or press Enter to skip):").ask()
@@ -41,4 +54,4 @@ def select_media_file(directory="."):
         return None
     
     # Return the absolute path to prevent "file not found" errors
-    return os.path.abspath(os.path.join(directory, file)) if file and file != "Go back" else None
+    return os.path.join(abs_dir, file) if file and file != "Go back" else None
@@ -0,0 +1,38 @@
+import sys
+import unittest
+from pathlib import Path
+from unittest import mock
+
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "src"))
+
+from peg_this.features.audio import _audio_output_args  # noqa: E402
+
+
+class TestAudioOutputArgs(unittest.TestCase):
+    def _info(self, codec_name):
+        return mock.Mock(audio_streams=[{"index": 1, "codec_type": "audio", "codec_name": codec_name}])
+
+    def test_matching_codec_is_copied(self):
+        args = _audio_output_args(self._info("mp3"), "mp3")
+        self.assertEqual(args["acodec"], "copy")
+        self.assertEqual(args["map"], "0:a:0")
+
+    def test_any_pcm_codec_is_copied_to_wav(self):
+        self.assertEqual(_audio_output_args(self._info("pcm_s24le"), "wav")["acodec"], "copy")
+
+    def test_pcm_the_wav_muxer_cannot_store_is_reencoded(self):
+        for codec_name in ["pcm_bluray", "pcm_dvd", "pcm_s16be"]:
+            with self.subTest(codec_name=codec_name):
+                self.assertEqual(_audio_output_args(self._info(codec_name), "wav")["acodec"], "pcm_s16le")
+
+    def test_other_codec_is_reencoded(self):
+        args = _audio_output_args(self._info("aac"), "mp3")
+        self.assertEqual(args["acodec"], "libmp3lame")
+        self.assertEqual(args["map"], "0:a:0")
+        self.assertEqual(_audio_output_args(self._info("aac"), "wav")["acodec"], "pcm_s16le")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,155 @@
+import logging
+import multiprocessing
+import sys
+import tempfile
+import unittest
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from unittest import mock
+
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "src"))
+
+from peg_this.features import batch  # noqa: E402
+from peg_this.features.batch import PRESETS, collect_media_files, load_track_actions, needs_processing  # noqa: E402
+from peg_this.features.interactive_convert import TrackAction  # noqa: E402
+from peg_this.utils.ffmpeg_utils import option_args  # noqa: E402
+
+
+class TestLoadTrackActions(unittest.TestCase):
+    def test_empty_preset_keeps_everything(self):
+        self.assertEqual(load_track_actions(None), {})
+        self.assertEqual(load_track_actions("{}"), {})
+
+    def test_actions_by_track_type(self):
+        actions = load_track_actions(
+            '{"video": {"action": "convert", "codec": "libx264 (H.264)"}, "subtitle": "remove"}'
+        )
+        self.assertEqual(actions["video"], {"action": TrackAction.CONVERT, "codec": "libx264 (H.264)"})
+        self.assertEqual(actions["subtitle"], {"action": TrackAction.REMOVE})
+        self.assertNotIn("audio", actions)
+
+    def test_convert_without_codec_is_rejected(self):
+        with self.assertRaises(ValueError):
+            load_track_actions('{"audio": {"action": "convert"}}')
+
+    def test_unknown_action_is_rejected(self):
+        with self.assertRaises(ValueError):
+            load_track_actions('{"audio": "transcode"}')
+
+    def test_action_that_is_not_a_string_or_object_is_rejected(self):
+        for value in ("5", "null", '["remove"]'):
+            with self.subTest(value=value), self.assertRaises(ValueError):
+                load_track_actions('{"video": %s}' % value)
+
+
+class TestCollectMediaFiles(unittest.TestCase):
+    def test_outputs_of_earlier_runs_are_skipped(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            root = Path(tmp)
+            (root / "season").mkdir()
+            for name in ["movie.mkv", "movie_modified.mkv", "season/ep1.mp4", "season/ep1_modified.mp4", "notes.txt"]:
+                (root / name).write_bytes(b"")
+            self.assertEqual(collect_media_files(root), [root / "movie.mkv", root / "season" / "ep1.mp4"])
+
+
+class TestNeedsProcessing(unittest.TestCase):
+    TRACKS = [
+        {"index": 0, "type": "video", "codec": "h264"},
+        {"index": 1, "type": "audio", "codec": "aac"},
+    ]
+
+    def test_keep_only_preset_changes_nothing(self):
+        self.assertFalse(needs_processing(self.TRACKS, {}))
+        self.assertFalse(needs_processing(self.TRACKS, {"subtitle": {"action": TrackAction.REMOVE}}))
+
+    def test_conversion_to_current_codec_changes_nothing(self):
+        actions = load_track_actions('{"video": {"action": "convert", "codec": "libx264 (H.264)"}, "audio": {"action": "convert", "codec": "aac"}}')
+        self.assertFalse(needs_processing(self.TRACKS, actions))
+
+    def test_conversion_to_other_codec_or_removal_changes_file(self):
+        self.assertTrue(needs_processing(self.TRACKS, load_track_actions('{"video": {"action": "convert", "codec": "libx265"}}')))
+        self.assertTrue(needs_processing(self.TRACKS, load_track_actions('{"audio": "remove"}')))
+
+
+class TestPresets(unittest.TestCase):
+    def _info(self, streams):
+        return mock.Mock(streams=streams, audio_streams=[s for s in streams if s["codec_type"] == "audio"])
+
+    def test_h264_aac_mp4_converts_video_and_audio(self):
+        args = PRESETS["h264_aac_mp4"](self._info([{"codec_type": "video"}, {"codec_type": "audio"}]))
+        self.assertEqual(args["c:v"], "libx264")
+        self.assertEqual(args["c:a"], "aac")
+        self.assertIn("sn", args)
+        self.assertNotIn("an", args)
+
+    def test_h264_aac_mp4_without_audio_disables_audio(self):
+        args = PRESETS["h264_aac_mp4"](self._info([{"codec_type": "video"}]))
+        self.assertIn("an", args)
+        self.assertNotIn("c:a", args)
+
+    def test_remux_mkv_drops_data_streams_and_converts_mp4_subtitles(self):
+        args = PRESETS["remux_mkv"](self._info([
+            {"codec_type": "video", "codec_name": "h264"},
+            {"codec_type": "subtitle", "codec_name": "subrip"},
+            {"codec_type": "subtitle", "codec_name": "mov_text"},
+            {"codec_type": "data", "codec_name": "bin_data"},
+        ]))
+        self.assertEqual(
+            option_args(args),
+            ["-c", "copy", "-c:s:1", "srt", "-map", "0", "-map", "-0:d?", "-y"],
+        )
+
+
+class TestInitWorker(unittest.TestCase):
+    def test_spawned_workers_append_to_the_log(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            log_file = Path(tmp) / "ffmpeg_log.txt"
+            log_file.write_text("parent line\n")
+            context = multiprocessing.get_context("spawn")
+            with ProcessPoolExecutor(1, mp_context=context, initializer=batch._init_worker, initargs=(str(log_file), 1)) as executor:
+                executor.submit(logging.error, "worker line").result()
+            self.assertEqual(log_file.read_text().splitlines()[0], "parent line")
+            self.assertIn("worker line", log_file.read_text())
+
+    def test_workers_share_the_cores_without_pinning(self):
+        self.addCleanup(setattr, batch, "_worker_threads", 0)
+        with mock.patch.object(batch.os, "cpu_count", return_value=8):
+            batch._init_worker(None, 4)
+            self.assertEqual(batch._worker_threads, 2)
+            batch._init_worker(None, 16)
+            self.assertEqual(batch._worker_threads, 1)
+
+
+@unittest.skipUnless(hasattr(batch.os, "sched_setaffinity"), "CPU affinity is Linux only")
+class TestPinWorker(unittest.TestCase):
+    def setUp(self):
+        self.addCleanup(setattr, batch, "_worker_threads", 0)
+
+    def test_workers_get_disjoint_cores(self):
+        next_slot = multiprocessing.Value("i", 0)
+        pinned = []
+        with mock.patch.object(batch.os, "sched_getaffinity", return_value=set(range(8))), \
+                mock.patch.object(batch.os, "sched_setaffinity") as setaffinity, \
+                mock.patch.object(batch.os, "nice") as nice:
+            for _ in range(4):
+                batch._pin_worker(next_slot, 4)
+                pinned.append(setaffinity.call_args[0][1])
+        self.assertEqual(pinned, [[0, 1], [2, 3], [4, 5], [6, 7]])
+        self.assertEqual(batch._worker_threads, 2)
+        nice.assert_called_with(5)
+
+    def test_more_jobs_than_cores_shares_cores(self):
+        next_slot = multiprocessing.Value("i", 0)
+        with mock.patch.object(batch.os, "sched_getaffinity", return_value={0, 1}), \
+                mock.patch.object(batch.os, "sched_setaffinity") as setaffinity, \
+                mock.patch.object(batch.os, "nice"):
+            for _ in range(3):
+                batch._pin_worker(next_slot, 3)
+        self.assertEqual(setaffinity.call_args[0][1], [0])
+        self.assertEqual(batch._worker_threads, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,30 @@
+import contextlib
+import io
+import sys
+import unittest
+from pathlib import Path
+
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "src"))
+
+from peg_this.peg_this import parse_args  # noqa: E402
+
+
+class TestParseArgs(unittest.TestCase):
+    def _rejects(self, argv):
+        with contextlib.redirect_stderr(io.StringIO()), self.assertRaises(SystemExit):
+            parse_args(argv)
+
+    def test_batch_needs_actions_or_preset(self):
+        self._rejects(["--batch", "videos"])
+        self.assertEqual(parse_args(["--batch", "videos", "--preset", "remux_mkv"]).preset, "remux_mkv")
+        self.assertEqual(parse_args(["--batch", "videos", "--actions", "actions.json"]).actions, "actions.json")
+
+    def test_batch_options_require_batch(self):
+        self._rejects(["--jobs", "2"])
+        self._rejects(["--pin-cores"])
+
+
+if __name__ == "__main__":
+    unittest.main()
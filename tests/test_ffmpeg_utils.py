@@ -0,0 +1,185 @@
+import io
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "src"))
+
+from rich.console import Console  # noqa: E402
+
+from peg_this.utils import ffmpeg_utils  # noqa: E402
+
+
+ENCODERS_OUTPUT = """Encoders:
+ V..... = Video
+ ------
+ V....D libx264              libx264 H.264 / AVC / MPEG-4 AVC / MPEG-4 part 10 (codec h264)
+ V....D h264_nvenc           NVIDIA NVENC H.264 encoder (codec h264)
+ V....D hevc_vaapi           H.265/HEVC (VAAPI) (codec hevc)
+ A....D aac                  AAC (Advanced Audio Coding)
+"""
+
+
+class TestHardwareEncoders(unittest.TestCase):
+    def setUp(self):
+        ffmpeg_utils._hw_encoders = None
+        self.addCleanup(setattr, ffmpeg_utils, "_hw_encoders", None)
+        ffmpeg_utils.get_codec_options.cache_clear()
+        self.addCleanup(ffmpeg_utils.get_codec_options.cache_clear)
+
+    @staticmethod
+    def _fake_run(broken=()):
+        def run(argv, **kwargs):
+            if "-encoders" in argv:
+                return subprocess.CompletedProcess(argv, 0, stdout=ENCODERS_OUTPUT)
+            encoder = argv[argv.index("-c:v") + 1]
+            if encoder in broken:
+                raise subprocess.CalledProcessError(1, argv, stderr=b"No capable devices found")
+            return subprocess.CompletedProcess(argv, 0)
+        return run
+
+    def test_detected_encoders_are_offered_for_video(self):
+        with mock.patch.object(ffmpeg_utils.subprocess, "run", side_effect=self._fake_run()) as run:
+            self.assertEqual(ffmpeg_utils.probe_hw_encoders(), {"h264_nvenc", "hevc_vaapi"})
+            options = ffmpeg_utils.get_codec_options("video")
+            ffmpeg_utils.get_codec_options("video")
+
+        # One encoder listing plus one test encode per listed hardware encoder
+        self.assertEqual(run.call_count, 3)
+        vaapi_argv = run.call_args_list[2][0][0]
+        self.assertIn(ffmpeg_utils.VAAPI_DEVICE, vaapi_argv)
+        self.assertIn("format=nv12,hwupload", vaapi_argv)
+        self.assertIn("h264_nvenc (NVIDIA H.264)", options)
+        self.assertIn("hevc_vaapi (VAAPI H.265/HEVC)", options)
+        self.assertNotIn("h264_qsv (Intel QSV H.264)", options)
+        self.assertNotIn("h264_nvenc (NVIDIA H.264)", ffmpeg_utils.get_codec_options("audio"))
+
+    def test_encoders_without_hardware_are_not_offered(self):
+        with mock.patch.object(ffmpeg_utils.subprocess, "run", side_effect=self._fake_run(broken={"h264_nvenc"})):
+            self.assertEqual(ffmpeg_utils.probe_hw_encoders(), {"hevc_vaapi"})
+            self.assertNotIn("h264_nvenc (NVIDIA H.264)", ffmpeg_utils.get_codec_options("video"))
+
+    def test_missing_ffmpeg_means_no_hw_encoders(self):
+        with mock.patch.object(ffmpeg_utils.subprocess, "run", side_effect=FileNotFoundError):
+            self.assertEqual(ffmpeg_utils.probe_hw_encoders(), frozenset())
+            self.assertEqual(ffmpeg_utils.get_codec_options("video")[0], "libx264 (H.264)")
+
+
+class TestMediaInfo(unittest.TestCase):
+    PROBE = {
+        "streams": [
+            {"index": 0, "codec_type": "video", "codec_name": "h264", "width": 1920, "height": 1080, "r_frame_rate": "25/1"},
+            {"index": 1, "codec_type": "audio", "codec_name": "aac", "channels": 2, "tags": {"language": "eng"}},
+            {"index": 2, "codec_type": "data", "codec_name": "bin_data"},
+        ]
+    }
+
+    def test_file_is_probed_once_across_accessors(self):
+        with mock.patch.object(ffmpeg_utils, "probe_cached", return_value=self.PROBE) as probe:
+            info = ffmpeg_utils.MediaInfo("movie.mkv")
+            self.assertTrue(info.has_audio())
+            self.assertEqual([s["index"] for s in info.video_streams], [0])
+            self.assertEqual([t["type"] for t in info.tracks], ["video", "audio"])
+            self.assertEqual(info.tracks[1]["language"], "eng")
+        probe.assert_called_once_with("movie.mkv")
+
+    def test_prefetched_probe_is_reused(self):
+        with mock.patch.object(ffmpeg_utils, "probe_cached", return_value=self.PROBE) as probe:
+            info = ffmpeg_utils.MediaInfo("movie.mkv").prefetch()
+            self.assertEqual(len(info.streams), 3)
+            info.prefetch()
+            self.assertTrue(info.has_audio())
+        probe.assert_called_once_with("movie.mkv")
+
+    def test_many_files_are_probed_concurrently(self):
+        with mock.patch.object(ffmpeg_utils, "probe_cached", return_value=self.PROBE) as probe:
+            results = dict(ffmpeg_utils.parse_media_tracks_many(["a.mkv", "b.mkv"], workers=2))
+            self.assertEqual(sorted(results), ["a.mkv", "b.mkv"])
+            self.assertEqual(len(results["b.mkv"].tracks), 2)
+        self.assertEqual(probe.call_count, 2)
+
+    def test_probe_failure_means_no_audio_and_no_tracks(self):
+        error = ffmpeg_utils.ffmpeg.Error("ffprobe", b"", b"invalid data")
+        with mock.patch.object(ffmpeg_utils, "probe_cached", side_effect=error):
+            info = ffmpeg_utils.MediaInfo("broken.mkv")
+            self.assertFalse(info.has_audio())
+            self.assertEqual(info.tracks, [])
+
+
+@unittest.skipUnless(sys.platform.startswith("linux"), "pipe sizes can only be changed on Linux")
+class TestEnlargePipe(unittest.TestCase):
+    def test_pipe_buffer_is_enlarged(self):
+        import fcntl
+
+        read_fd, write_fd = os.pipe()
+        self.addCleanup(os.close, write_fd)
+        with os.fdopen(read_fd, "rb") as pipe:
+            ffmpeg_utils.enlarge_pipe(pipe, 1 << 16)
+            self.assertGreaterEqual(fcntl.fcntl(read_fd, getattr(fcntl, "F_GETPIPE_SZ", 1032)), 1 << 16)
+
+
+class TestRunArgv(unittest.TestCase):
+    def test_quiet_failure_is_only_logged(self):
+        failed = subprocess.CompletedProcess([], 1, stdout=b"", stderr=b"movie.mkv: Invalid data")
+        with mock.patch.object(ffmpeg_utils.subprocess, "run", return_value=failed), \
+                mock.patch.object(ffmpeg_utils, "console") as console, \
+                mock.patch.object(ffmpeg_utils.logging, "error") as log_error:
+            self.assertIsNone(ffmpeg_utils.run_argv(["ffmpeg", "-i", "movie.mkv", "out.mkv"], quiet=True))
+        console.print.assert_not_called()
+        self.assertIn("Invalid data", log_error.call_args[0][0])
+
+
+FAKE_FFMPEG = """#!/bin/sh
+# Writes progress to the "-progress pipe:N" fd that run_argv puts first
+fd=${2#pipe:}
+echo "$@" > "$(dirname "$0")/args.txt"
+for t in 1000000 2000000 N/A; do eval "echo out_time_us=$t >&$fd"; done
+echo "some log line" >&2
+printf 'title : \\377\\376 not utf-8\\n' >&2
+exit ${FAKE_FFMPEG_EXIT:-0}
+"""
+
+
+class TestProgress(unittest.TestCase):
+    def test_progress_lines_are_parsed(self):
+        self.assertEqual(ffmpeg_utils._progress_pipe_time(b"out_time_us=62500000\n"), 62.5)
+        self.assertIsNone(ffmpeg_utils._progress_pipe_time(b"out_time_us=N/A\n"))
+        self.assertIsNone(ffmpeg_utils._progress_pipe_time(b"frame=12\n"))
+
+    def test_stderr_stats_lines_are_parsed(self):
+        self.assertEqual(ffmpeg_utils._stderr_time("frame= 10 fps=0.0 time=00:01:02.50 bitrate=N/A"), 62.5)
+        self.assertIsNone(ffmpeg_utils._stderr_time("Input #0, matroska,webm, from 'movie.mkv':"))
+
+    @unittest.skipUnless(os.name == "posix", "the progress pipe is POSIX only")
+    def test_progress_is_read_from_a_dedicated_pipe(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        fake = Path(tmp.name) / "ffmpeg"
+        fake.write_text(FAKE_FFMPEG)
+        fake.chmod(0o755)
+
+        env = {"PATH": f"{tmp.name}{os.pathsep}{os.environ['PATH']}"}
+        with mock.patch.dict(os.environ, env), \
+                mock.patch.object(ffmpeg_utils, "probe_cached", return_value={"format": {"duration": "2"}}), \
+                mock.patch.object(ffmpeg_utils, "console", Console(file=io.StringIO())):
+            with mock.patch.object(ffmpeg_utils.logging, "debug") as log_debug:
+                self.assertEqual(ffmpeg_utils.run_argv(["ffmpeg", "-i", "in.mkv", "out.mkv"], show_progress=True), "Success")
+            # Undecodable stderr is logged rather than stopping the stderr drain
+            self.assertIn("not utf-8", log_debug.call_args[0][0])
+            args = (Path(tmp.name) / "args.txt").read_text().split()
+            self.assertEqual(args[0], "-progress")
+            self.assertEqual(args[2:], ["-nostats", "-i", "in.mkv", "out.mkv"])
+
+            with mock.patch.dict(os.environ, {"FAKE_FFMPEG_EXIT": "1"}), \
+                    mock.patch.object(ffmpeg_utils.logging, "getLogger"):
+                self.assertIsNone(ffmpeg_utils.run_argv(["ffmpeg", "-i", "in.mkv", "out.mkv"], show_progress=True))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,89 @@
+import os
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "src"))
+
+from peg_this.utils import ffprobe_cache  # noqa: E402
+
+
+PROBE = {"streams": [{"index": 0, "codec_type": "audio", "codec_name": "mp3"}], "format": {"duration": "1.0"}}
+
+
+class TestProbeCached(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.tmp = Path(tmp.name)
+
+        patcher = mock.patch.object(ffprobe_cache, "CACHE_DIR", self.tmp / "cache")
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        ffprobe_cache._probe.cache_clear()
+        self.addCleanup(ffprobe_cache._probe.cache_clear)
+
+        self.media = self.tmp / "song.mp3"
+        self.media.write_bytes(b"data")
+
+    def test_repeat_probe_hits_memory(self):
+        with mock.patch.object(ffprobe_cache, "_fast_probe", return_value=PROBE) as probe:
+            self.assertEqual(ffprobe_cache.probe_cached(str(self.media)), PROBE)
+            self.assertEqual(ffprobe_cache.probe_cached(str(self.media)), PROBE)
+        probe.assert_called_once()
+
+    def test_probe_is_reused_from_disk(self):
+        with mock.patch.object(ffprobe_cache, "_fast_probe", return_value=PROBE):
+            ffprobe_cache.probe_cached(str(self.media))
+        self.assertEqual(len(list((self.tmp / "cache").glob("*.json"))), 1)
+
+        ffprobe_cache._probe.cache_clear()
+        with mock.patch.object(ffprobe_cache, "_fast_probe") as probe:
+            self.assertEqual(ffprobe_cache.probe_cached(str(self.media)), PROBE)
+        probe.assert_not_called()
+
+    def test_modified_file_is_probed_again(self):
+        with mock.patch.object(ffprobe_cache, "_fast_probe", return_value=PROBE) as probe:
+            ffprobe_cache.probe_cached(str(self.media))
+            self.media.write_bytes(b"longer data")
+            ffprobe_cache.probe_cached(str(self.media))
+        self.assertEqual(probe.call_count, 2)
+
+    def test_missing_file_is_not_cached(self):
+        missing = str(self.tmp / "missing.mp3")
+        with mock.patch.object(ffprobe_cache, "_fast_probe", return_value=PROBE) as probe:
+            ffprobe_cache.probe_cached(missing)
+        probe.assert_called_once_with(missing)
+        self.assertFalse(os.path.exists(self.tmp / "cache"))
+
+
+class TestFastProbe(unittest.TestCase):
+    def test_falls_back_to_ffmpeg_probe_without_orjson(self):
+        with mock.patch.object(ffprobe_cache, "orjson", None), \
+                mock.patch.object(ffprobe_cache.ffmpeg, "probe", return_value=PROBE) as probe:
+            self.assertEqual(ffprobe_cache._fast_probe("song.mp3"), PROBE)
+        probe.assert_called_once_with("song.mp3")
+
+    @unittest.skipIf(ffprobe_cache.orjson is None, "orjson is not installed")
+    def test_parses_ffprobe_output_with_orjson(self):
+        process = mock.Mock(returncode=0)
+        process.communicate.return_value = (b'{"streams": [], "format": {}}', b"")
+        with mock.patch.object(ffprobe_cache.subprocess, "Popen", return_value=process) as popen:
+            self.assertEqual(ffprobe_cache._fast_probe("song.mp3"), {"streams": [], "format": {}})
+        self.assertIn("-show_streams", popen.call_args[0][0])
+
+    @unittest.skipIf(ffprobe_cache.orjson is None, "orjson is not installed")
+    def test_ffprobe_failure_raises_ffmpeg_error(self):
+        process = mock.Mock(returncode=1)
+        process.communicate.return_value = (b"", b"song.mp3: No such file or directory")
+        with mock.patch.object(ffprobe_cache.subprocess, "Popen", return_value=process):
+            with self.assertRaises(ffprobe_cache.ffmpeg.Error):
+                ffprobe_cache._fast_probe("song.mp3")
+
+
+if __name__ == "__main__":
+    unittest.main()
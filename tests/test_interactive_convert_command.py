@@ -1,6 +1,7 @@
 import sys
 import unittest
 from pathlib import Path
+from unittest import mock
 
 
 ROOT = Path(__file__).resolve().parents[1]
@@ -9,18 +10,23 @@ sys.path.insert(0, str(ROOT / "src"))
 from peg_this.features.interactive_convert import InteractiveConverter, TrackAction  # noqa: E402
 
 
-def _maps(args):
-    return [args[i + 1] for i, arg in enumerate(args) if arg == "-map" and i + 1 < len(args)]
-
-def _flag_value(args, flag):
-    for i, arg in enumerate(args):
-        if arg == flag and i + 1 < len(args):
-            return args[i + 1]
-    return None
+def _parse(args):
+    """Split ffmpeg args in one pass into the -map values and a {flag: first value} dict (None for bare flags)."""
+    maps, flags = [], {}
+    i = 0
+    while i < len(args):
+        arg = args[i]
+        value = args[i + 1] if i + 1 < len(args) and not args[i + 1].startswith("-") else None
+        if arg == "-map":
+            maps.append(value)
+        elif arg.startswith("-"):
+            flags.setdefault(arg, value)
+        i += 1 if value is None else 2
+    return maps, flags
 
 
 class TestInteractiveConvertCommand(unittest.TestCase):
-    def _converter(self, tracks=None):
+    def _converter(self, tracks=None, extra_streams=()):
         converter = InteractiveConverter("input.mkv")
         converter.output_path = Path("output.mkv")
         converter.tracks = tracks or [
@@ -28,20 +34,41 @@ class TestInteractiveConvertCommand(unittest.TestCase):
             {"index": 2, "type": "audio", "codec": "aac"},
             {"index": 5, "type": "subtitle", "codec": "subrip"},
         ]
+        streams = [{"index": t["index"], "codec_type": t["type"]} for t in converter.tracks] + list(extra_streams)
+        converter.info = mock.Mock(streams=streams)
         converter.track_actions = {}
         return converter
 
-    def test_keep_all_tracks_with_gapped_indexes(self):
+    def test_keep_all_tracks_remuxes_with_map_all(self):
+        converter = self._converter()
+        cmd = converter.generate_ffmpeg_command()
+        self.assertIsNotNone(cmd)
+
+        args = cmd.get_args()
+        maps, flags = _parse(args)
+        self.assertEqual(maps, ["0"])
+        self.assertEqual(flags.get("-c"), "copy")
+        self.assertNotIn("-c:v:0", args)
+        self.assertNotIn("-c:a:0", args)
+        self.assertNotIn("-c:s:0", args)
+
+    def test_keep_all_tracks_with_container_change_maps_each_track(self):
         converter = self._converter()
+        converter.output_path = Path("output.mp4")
         cmd = converter.generate_ffmpeg_command()
         self.assertIsNotNone(cmd)
 
         args = cmd.get_args()
-        self.assertEqual(_maps(args), ["0:0", "0:2", "0:5"])
-        self.assertIn("-c:v:0", args)
-        self.assertIn("copy", args)
-        self.assertIn("-c:a:0", args)
-        self.assertIn("-c:s:0", args)
+        maps, flags = _parse(args)
+        self.assertEqual(maps, ["0:0", "0:2", "0:5"])
+        self.assertEqual(flags.get("-c"), "copy")
+
+    def test_keep_all_tracks_with_data_stream_maps_each_track(self):
+        converter = self._converter(extra_streams=[{"index": 6, "codec_type": "data"}])
+        args = converter.generate_ffmpeg_command().get_args()
+        maps, flags = _parse(args)
+        self.assertEqual(maps, ["0:0", "0:2", "0:5"])
+        self.assertEqual(flags.get("-c"), "copy")
 
     def test_all_tracks_removed_returns_none(self):
         converter = self._converter()
@@ -59,10 +86,10 @@ class TestInteractiveConvertCommand(unittest.TestCase):
         self.assertIsNotNone(cmd)
 
         args = cmd.get_args()
-        self.assertEqual(_maps(args), ["0:2", "0:5"])
+        maps, flags = _parse(args)
+        self.assertEqual(maps, ["0:2", "0:5"])
         self.assertNotIn("-c:v:0", args)
-        self.assertEqual(_flag_value(args, "-c:a:0"), "copy")
-        self.assertEqual(_flag_value(args, "-c:s:0"), "copy")
+        self.assertEqual(flags.get("-c"), "copy")
 
     def test_remove_audio_track_by_track_id(self):
         converter = self._converter()
@@ -71,7 +98,8 @@ class TestInteractiveConvertCommand(unittest.TestCase):
         self.assertIsNotNone(cmd)
 
         args = cmd.get_args()
-        self.assertEqual(_maps(args), ["0:0", "0:5"])
+        maps, _ = _parse(args)
+        self.assertEqual(maps, ["0:0", "0:5"])
         self.assertNotIn("-c:a:0", args)
 
     def test_convert_audio_sets_codec_and_bitrate(self):
@@ -81,10 +109,10 @@ class TestInteractiveConvertCommand(unittest.TestCase):
         self.assertIsNotNone(cmd)
 
         args = cmd.get_args()
-        self.assertIn("-c:a:0", args)
-        self.assertIn("aac", args)
-        self.assertIn("-b:a:0", args)
-        self.assertIn("192k", args)
+        _, flags = _parse(args)
+        self.assertEqual(flags.get("-c:a:0"), "aac")
+        self.assertEqual(flags.get("-b:a:0"), "192k")
+        self.assertNotIn("-threads:a:0", flags)
 
     def test_convert_audio_from_ui_choice_is_normalized(self):
         converter = self._converter()
@@ -93,8 +121,9 @@ class TestInteractiveConvertCommand(unittest.TestCase):
         self.assertIsNotNone(cmd)
 
         args = cmd.get_args()
-        self.assertEqual(_flag_value(args, "-c:a:0"), "libmp3lame")
-        self.assertEqual(_flag_value(args, "-b:a:0"), "192k")
+        _, flags = _parse(args)
+        self.assertEqual(flags.get("-c:a:0"), "libmp3lame")
+        self.assertEqual(flags.get("-b:a:0"), "192k")
 
     def test_multiple_audio_keep_and_convert_indexes_compact(self):
         tracks = [
@@ -109,10 +138,12 @@ class TestInteractiveConvertCommand(unittest.TestCase):
         self.assertIsNotNone(cmd)
 
         args = cmd.get_args()
-        self.assertEqual(_maps(args), ["0:0", "0:1", "0:4", "0:6"])
-        self.assertEqual(_flag_value(args, "-c:a:0"), "copy")
-        self.assertEqual(_flag_value(args, "-c:a:1"), "libopus")
-        self.assertEqual(_flag_value(args, "-b:a:1"), "160k")
+        maps, flags = _parse(args)
+        self.assertEqual(maps, ["0:0", "0:1", "0:4", "0:6"])
+        self.assertNotIn("-c", args)
+        self.assertEqual(flags.get("-c:a:0"), "copy")
+        self.assertEqual(flags.get("-c:a:1"), "libopus")
+        self.assertEqual(flags.get("-b:a:1"), "160k")
 
     def test_convert_subtitle_choice_is_normalized(self):
         converter = self._converter()
@@ -121,8 +152,8 @@ class TestInteractiveConvertCommand(unittest.TestCase):
         self.assertIsNotNone(cmd)
 
         args = cmd.get_args()
-        self.assertIn("-c:s:0", args)
-        self.assertIn("srt", args)
+        _, flags = _parse(args)
+        self.assertEqual(flags.get("-c:s:0"), "srt")
 
     def test_convert_subtitle_mov_text_choice_is_normalized(self):
         converter = self._converter()
@@ -131,7 +162,8 @@ class TestInteractiveConvertCommand(unittest.TestCase):
         self.assertIsNotNone(cmd)
 
         args = cmd.get_args()
-        self.assertEqual(_flag_value(args, "-c:s:0"), "mov_text")
+        _, flags = _parse(args)
+        self.assertEqual(flags.get("-c:s:0"), "mov_text")
 
     def test_convert_subtitle_legacy_choice_is_normalized(self):
         converter = self._converter()
@@ -140,8 +172,8 @@ class TestInteractiveConvertCommand(unittest.TestCase):
         self.assertIsNotNone(cmd)
 
         args = cmd.get_args()
-        self.assertIn("-c:s:0", args)
-        self.assertIn("srt", args)
+        _, flags = _parse(args)
+        self.assertEqual(flags.get("-c:s:0"), "srt")
 
     def test_multiple_subtitles_remove_then_convert_indexes_compact(self):
         tracks = [
@@ -159,9 +191,10 @@ class TestInteractiveConvertCommand(unittest.TestCase):
         self.assertIsNotNone(cmd)
 
         args = cmd.get_args()
-        self.assertEqual(_maps(args), ["0:0", "0:2", "0:7"])
+        maps, flags = _parse(args)
+        self.assertEqual(maps, ["0:0", "0:2", "0:7"])
         self.assertNotIn("-c:s:1", args)
-        self.assertEqual(_flag_value(args, "-c:s:0"), "srt")
+        self.assertEqual(flags.get("-c:s:0"), "srt")
 
     def test_map_order_is_video_then_audio_then_subtitle(self):
         tracks = [
@@ -174,7 +207,8 @@ class TestInteractiveConvertCommand(unittest.TestCase):
         self.assertIsNotNone(cmd)
 
         args = cmd.get_args()
-        self.assertEqual(_maps(args), ["0:0", "0:2", "0:5"])
+        maps, _ = _parse(args)
+        self.assertEqual(maps, ["0:0", "0:2", "0:5"])
 
     def test_convert_video_sets_expected_args(self):
         converter = self._converter()
@@ -183,9 +217,96 @@ class TestInteractiveConvertCommand(unittest.TestCase):
         self.assertIsNotNone(cmd)
 
         args = cmd.get_args()
-        self.assertEqual(_flag_value(args, "-c:v:0"), "libx265")
-        self.assertEqual(_flag_value(args, "-crf:v:0"), "28")
-        self.assertEqual(_flag_value(args, "-preset:v:0"), "medium")
+        _, flags = _parse(args)
+        self.assertEqual(flags.get("-c:v:0"), "libx265")
+        self.assertEqual(flags.get("-crf:v:0"), "28")
+        self.assertEqual(flags.get("-preset:v:0"), "medium")
+        self.assertNotIn("-threads:v:0", flags)
+        self.assertNotIn("-x265-params:v:0", flags)
+
+    def test_convert_x264_without_thread_limit_keeps_encoder_defaults(self):
+        converter = self._converter()
+        converter.track_actions = {0: {"action": TrackAction.CONVERT, "codec": "libx264 (H.264)"}}
+        cmd = converter.generate_ffmpeg_command()
+        self.assertIsNotNone(cmd)
+
+        args = cmd.get_args()
+        _, flags = _parse(args)
+        self.assertNotIn("-threads:v:0", flags)
+        self.assertNotIn("-x264-params:v:0", flags)
+        self.assertEqual(flags.get("-crf:v:0"), "23")
+
+    def test_convert_with_thread_limit_caps_encoder_threads(self):
+        converter = self._converter()
+        converter.threads = 4
+        converter.track_actions = {0: {"action": TrackAction.CONVERT, "codec": "libx265"}}
+        args = converter.generate_ffmpeg_command().get_args()
+        _, flags = _parse(args)
+        self.assertEqual(flags.get("-threads:v:0"), "4")
+        self.assertEqual(flags.get("-x265-params:v:0"), "pools=4")
+
+    def test_convert_x264_with_thread_limit_caps_encoder_threads(self):
+        converter = self._converter()
+        converter.threads = 2
+        converter.track_actions = {0: {"action": TrackAction.CONVERT, "codec": "libx264"}}
+        _, flags = _parse(converter.generate_ffmpeg_command().get_args())
+        self.assertEqual(flags.get("-threads:v:0"), "2")
+        self.assertEqual(flags.get("-x264-params:v:0"), "threads=2")
+
+    def test_convert_video_nvenc_sets_hw_args(self):
+        converter = self._converter()
+        converter.track_actions = {0: {"action": TrackAction.CONVERT, "codec": "hevc_nvenc (NVIDIA H.265/HEVC)"}}
+        cmd = converter.generate_ffmpeg_command()
+        self.assertIsNotNone(cmd)
+
+        args = cmd.get_args()
+        _, flags = _parse(args)
+        self.assertEqual(flags.get("-c:v:0"), "hevc_nvenc")
+        self.assertEqual(flags.get("-preset:v:0"), "p4")
+        self.assertEqual(flags.get("-cq:v:0"), "23")
+        self.assertNotIn("-threads:v:0", args)
+
+    def test_convert_video_vaapi_uploads_frames_to_device(self):
+        converter = self._converter()
+        converter.track_actions = {0: {"action": TrackAction.CONVERT, "codec": "hevc_vaapi (VAAPI H.265/HEVC)"}}
+        cmd = converter.generate_ffmpeg_command()
+        self.assertIsNotNone(cmd)
+
+        args = cmd.get_args()
+        _, flags = _parse(args)
+        self.assertLess(args.index("-vaapi_device"), args.index("-i"))
+        self.assertEqual(flags.get("-filter:v:0"), "format=nv12,hwupload")
+
+    def test_software_conversion_has_no_vaapi_device(self):
+        converter = self._converter()
+        converter.track_actions = {0: {"action": TrackAction.CONVERT, "codec": "libx264 (H.264)"}}
+        cmd = converter.generate_ffmpeg_command()
+        self.assertIsNotNone(cmd)
+        self.assertNotIn("-vaapi_device", cmd.get_args())
+
+    def test_build_argv_matches_generated_command(self):
+        cases = [
+            ({}, "output.mkv"),
+            ({}, "output.mp4"),
+            ({0: {"action": TrackAction.REMOVE}}, "output.mkv"),
+            ({1: {"action": TrackAction.CONVERT, "codec": "aac"}, 2: {"action": TrackAction.REMOVE}}, "output.mkv"),
+            ({0: {"action": TrackAction.CONVERT, "codec": "libx264 (H.264)"}}, "output.mp4"),
+            ({0: {"action": TrackAction.CONVERT, "codec": "hevc_vaapi (VAAPI H.265/HEVC)"}}, "output.mkv"),
+        ]
+        for track_actions, output in cases:
+            with self.subTest(track_actions=track_actions, output=output):
+                converter = self._converter()
+                converter.output_path = Path(output)
+                converter.track_actions = track_actions
+                self.assertEqual(
+                    converter.build_argv(),
+                    ["ffmpeg", "-hide_banner"] + converter.generate_ffmpeg_command().get_args(),
+                )
+
+    def test_build_argv_returns_none_without_tracks(self):
+        converter = self._converter()
+        converter.track_actions = {i: {"action": TrackAction.REMOVE} for i in range(3)}
+        self.assertIsNone(converter.build_argv())
 
 
 if __name__ == "__main__":
@@ -0,0 +1,42 @@
+import os
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "src"))
+
+from peg_this.utils.ui_utils import get_media_files  # noqa: E402
+
+
+class TestGetMediaFiles(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.dir = Path(tmp.name)
+
+    def test_only_media_files_are_listed(self):
+        for name in ["movie.mkv", "SONG.MP3", "notes.txt", ".mp4", "noext"]:
+            (self.dir / name).write_bytes(b"")
+        (self.dir / "folder.mp4").mkdir()
+        self.assertEqual(get_media_files(str(self.dir)), ["movie.mkv", "SONG.MP3"])
+
+    @unittest.skipUnless(hasattr(os, "symlink"), "symlinks are not supported")
+    def test_symlinked_media_files_are_listed(self):
+        (self.dir / "movie.mkv").write_bytes(b"")
+        try:
+            os.symlink(self.dir / "movie.mkv", self.dir / "link.mkv")
+        except OSError:
+            self.skipTest("cannot create symlinks")
+        self.assertEqual(get_media_files(str(self.dir)), ["link.mkv", "movie.mkv"])
+
+    def test_missing_directory_has_no_media_files(self):
+        self.assertEqual(get_media_files(str(self.dir / "missing")), [])
+        (self.dir / "movie.mkv").write_bytes(b"")
+        self.assertEqual(get_media_files(str(self.dir / "movie.mkv")), [])
+
+
+if __name__ == "__main__":
+    unittest.main()